@@ -11,11 +11,21 @@
         'data' : [
             "security/hostel_security.xml",
             "security/ir.model.access.csv",
+            "data/hostel.postcode.csv",
             "data/data.xml",
+            "data/ir_cron_data.xml",
             "views/hostel.xml",
             "views/room_views.xml",
             "views/student_views.xml",
             "views/hostel_category_views.xml",
+            "views/hostel_perf_views.xml",
+            "views/hostel_rent_views.xml",
+            "views/hostel_stay_history_views.xml",
+            "views/hostel_job_views.xml",
+            "views/hostel_postcode_views.xml",
+            "report/hostel_occupancy_report_views.xml",
+            "wizards/student_allocation_views.xml",
+            "wizards/room_assignment_views.xml",
         ],
 
         'assets': {
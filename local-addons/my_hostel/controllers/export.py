@@ -0,0 +1,142 @@
+import csv
+import io
+import tempfile
+
+import xlsxwriter
+
+from odoo import http
+from odoo.http import request
+
+# Nombre de lignes lues à chaque FETCH sur le curseur serveur
+EXPORT_FETCH_SIZE = 2000
+
+# Taille des morceaux envoyés au client pour l'export XLSX
+EXPORT_XLSX_BLOCK_SIZE = 64 * 1024
+
+# Une feuille XLSX est limitée à 1 048 576 lignes : on continue sur une nouvelle feuille au-delà
+EXPORT_XLSX_SHEET_ROWS = 1000000
+
+EXPORT_HEADER = [
+    "Student", "Room", "Room No.", "Floor No.", "Hostel", "Admission Date", "Discharge Date", "Rent Amount", "Currency",
+]
+
+
+class HostelOccupancyExport(http.Controller):
+
+    """
+Export de la liste d'occupation (étudiant, chambre, n° et étage, hostel, dates d'entrée/sortie, loyer), en CSV ou en XLSX.
+
+L'export standard d'Odoo lit tous les enregistrements en mémoire avant d'écrire le fichier : au-delà de ~200 000 lignes,
+le worker manque de mémoire. Ici :
+- une seule requête à plat (jointure hostel.student / hostel.room / hostel.hostel), sans passer par l'ORM ;
+- les lignes sont lues par un curseur côté serveur (DECLARE ... CURSOR / FETCH), EXPORT_FETCH_SIZE lignes à la fois ;
+- la réponse HTTP est un générateur (transfert "chunked") : chaque paquet est envoyé au client dès qu'il est lu.
+La mémoire utilisée reste donc constante, quelle que soit la taille de l'export.
+
+Le format XLSX est un fichier zip qui ne peut être envoyé qu'une fois terminé : il est écrit en mode 'constant_memory'
+dans un fichier temporaire, puis envoyé par morceaux.
+
+- /hostel/export/occupancy.csv
+- /hostel/export/occupancy.xlsx
+Paramètres optionnels : ?hostel=CODE (un seul hostel), ?current=1 (séjours en cours uniquement).
+    """
+
+    _EXPORT_QUERY = """
+        SELECT concat_ws(' ', s.student_firstname, s.student_lastname),
+               r.name, r.room_no, r.floor_no, h.name,
+               s.admission_date, s.discharge_date, r.rent_amount, c.name
+          FROM hostel_student s
+          JOIN hostel_room r ON r.id = s.room_id
+     LEFT JOIN hostel_hostel h ON h.id = r.hostel_id
+     LEFT JOIN res_currency c ON c.id = r.currency_id
+         WHERE {where}
+      ORDER BY h.id, r.id, s.id
+    """
+
+    # ========
+    # Endpoint
+    # ========
+
+    @http.route('/hostel/export/occupancy.<string:file_format>', type='http', auth='user', methods=['GET'])
+    def export_occupancy(self, file_format, hostel=None, current=None, **kwargs):
+        if file_format not in ('csv', 'xlsx'):
+            return request.not_found()
+        # La requête SQL ne passe pas par l'ORM : on vérifie les droits de lecture des modèles exportés.
+        for model_name in ('hostel.student', 'hostel.room', 'hostel.hostel'):
+            request.env[model_name].check_access_rights('read')
+
+        where, params = ["TRUE"], {}
+        if hostel:
+            where.append("h.hostel_code = %(hostel)s")
+            params['hostel'] = hostel
+        if current in ('1', 'true', 'True'):
+            where.append("(s.discharge_date IS NULL OR s.discharge_date >= CURRENT_DATE)")
+        query = self._EXPORT_QUERY.format(where=" AND ".join(where))
+
+        # Le curseur de la requête est fermé dès que la méthode retourne : le générateur ouvre son propre curseur.
+        registry = request.env.registry
+        if file_format == 'csv':
+            body = self._stream_csv(registry, query, params)
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            body = self._stream_xlsx(registry, query, params)
+            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        headers = [
+            ('Content-Type', content_type),
+            ('Content-Disposition', f'attachment; filename="occupancy.{file_format}"'),
+        ]
+        return request.make_response(body, headers=headers)
+
+    # =======
+    # Helpers
+    # =======
+
+    def _fetch_batches(self, registry, query, params):
+        """
+        Générateur des lignes de la requête, par paquets de EXPORT_FETCH_SIZE, lus sur un curseur côté serveur.
+        """
+        with registry.cursor() as cr:
+            cr.execute(f"DECLARE hostel_occupancy_export NO SCROLL CURSOR FOR {query}", params)
+            while True:
+                cr.execute("FETCH FORWARD %s FROM hostel_occupancy_export", [EXPORT_FETCH_SIZE])
+                rows = cr.fetchall()
+                if not rows:
+                    break
+                yield rows
+            cr.execute("CLOSE hostel_occupancy_export")
+
+    def _stream_csv(self, registry, query, params):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_HEADER)
+        for rows in self._fetch_batches(registry, query, params):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    def _stream_xlsx(self, registry, query, params):
+        with tempfile.TemporaryFile() as file:
+            workbook = xlsxwriter.Workbook(file, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+            bold = workbook.add_format({'bold': True})
+            sheet, row_index = None, EXPORT_XLSX_SHEET_ROWS
+            for rows in self._fetch_batches(registry, query, params):
+                for row in rows:
+                    if row_index >= EXPORT_XLSX_SHEET_ROWS:
+                        sheet = workbook.add_worksheet()
+                        sheet.write_row(0, 0, EXPORT_HEADER, bold)
+                        row_index = 0
+                    row_index += 1
+                    sheet.write_row(row_index, 0, row)
+            if sheet is None:
+                workbook.add_worksheet().write_row(0, 0, EXPORT_HEADER, bold)
+            workbook.close()
+
+            file.seek(0)
+            while True:
+                block = file.read(EXPORT_XLSX_BLOCK_SIZE)
+                if not block:
+                    break
+                yield block
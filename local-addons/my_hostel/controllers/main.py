@@ -0,0 +1,162 @@
+import hashlib
+
+from werkzeug.http import http_date, parse_date
+
+from odoo import http
+from odoo.http import request
+
+# Nombre maximal d'enregistrements par page
+MAX_PAGE_SIZE = 500
+
+# Rayon maximal (km) de la recherche des hostels les plus proches
+MAX_SEARCH_RADIUS_KM = 500
+
+# Tailles des miniatures d'hostel servies par l'API (cf. champs image_<taille> de hostel.hostel)
+HOSTEL_IMAGE_SIZES = (1024, 256, 128)
+
+
+class HostelApi(http.Controller):
+
+    """
+API JSON en lecture seule pour le portail de réservation public.
+
+- /hostel/api/hostels                        : liste des hostels actifs
+- /hostel/api/rooms?hostel=CODE&available=1  : liste des chambres (d'un hostel, avec au moins un lit libre)
+- /hostel/api/hostels/<id>/image/<taille>     : miniature d'un hostel (1024, 256 ou 128 px)
+- /hostel/api/hostels/nearest?lat=..&lon=..   : hostels les plus proches d'un point (ou ?zip=..&country=FR), triés par distance,
+                                               avec &radius=<km> (50), &limit=<n> (10) et &available=1 (au moins un lit libre)
+
+Les hostels ne renvoient pas l'image elle-même mais 'image_url', l'URL de la miniature 128 px. Elle contient un paramètre 'unique'
+qui change à chaque modification de l'hostel : l'image est donc servie avec un cache long et "immutable".
+
+Seuls les champs utiles sont renvoyés (search_read) et la pagination se fait par clé ("keyset") sur l'id :
+?after=<dernier id reçu>&limit=100. Contrairement à un offset, le coût d'une page ne dépend pas de sa position.
+La réponse contient 'next_after', à repasser en paramètre pour obtenir la page suivante (null s'il n'y en a plus).
+
+Cache HTTP :
+Chaque réponse porte un ETag et un Last-Modified calculés à partir de MAX(write_date) et COUNT(*) sur le filtre demandé
+(une seule requête d'agrégat, sans lire les enregistrements). Si le client renvoie If-None-Match / If-Modified-Since
+et que rien n'a changé, on répond 304 sans exécuter la requête de lecture.
+Le write_date des chambres est aussi mis à jour quand leurs occupants changent (cf. hostel.room._touch_occupancy()).
+    """
+
+    # =========
+    # Endpoints
+    # =========
+
+    @http.route('/hostel/api/hostels', type='http', auth='public', methods=['GET'], csrf=False)
+    def api_hostels(self, after=0, limit=100, **kwargs):
+        domain = []
+        return self._paginated_response(
+            'hostel.hostel', domain, ['name', 'hostel_code', 'city', 'zip', 'type', 'write_date'], after, limit,
+            postprocess=self._add_hostel_image_url,
+        )
+
+    @http.route('/hostel/api/hostels/<int:hostel_id>/image/<int:size>', type='http', auth='public', methods=['GET'], csrf=False)
+    def api_hostel_image(self, hostel_id, size, unique=None, **kwargs):
+        if size not in HOSTEL_IMAGE_SIZES:
+            return request.not_found()
+        # search() plutôt que browse() : comme la liste, n'expose que les hostels actifs.
+        hostel = request.env['hostel.hostel'].sudo().search([('id', '=', hostel_id)], limit=1)
+        if not hostel:
+            return request.not_found()
+        stream = request.env['ir.binary']._get_image_stream_from(hostel, f'image_{size}')
+        if unique:
+            # L'URL change avec l'image : le navigateur et les proxys peuvent la garder indéfiniment.
+            return stream.get_response(max_age=http.STATIC_CACHE_LONG, immutable=True)
+        return stream.get_response()
+
+    @http.route('/hostel/api/hostels/nearest', type='http', auth='public', methods=['GET'], csrf=False)
+    def api_nearest_hostels(self, lat=None, lon=None, zip=None, country=None, radius=50, limit=10, available=None, **kwargs):
+        try:
+            radius = min(max(float(radius), 0.0), MAX_SEARCH_RADIUS_KM)
+            limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+            if zip:
+                domain = [('zip', '=', zip)] + ([('country_id.code', '=', country.upper())] if country else [])
+                postcode = request.env['hostel.postcode'].sudo().search(domain, limit=1)
+                if not postcode:
+                    return request.make_json_response({'error': f"Unknown zip '{zip}'"}, status=404)
+                lat, lon = postcode.latitude, postcode.longitude
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            return request.make_json_response({'error': "Invalid 'lat', 'lon', 'radius' or 'limit' parameter"}, status=400)
+
+        nearest = request.env['hostel.hostel'].sudo().search_nearest(
+            lat, lon, radius_km=radius, limit=limit, available=available in ('1', 'true', 'True'),
+        )
+        items = [
+            {'id': hostel.id, 'name': hostel.name, 'hostel_code': hostel.hostel_code, 'city': hostel.city, 'distance_km': round(distance, 2)}
+            for hostel, distance in nearest
+        ]
+        return request.make_json_response({'items': items})
+
+    @http.route('/hostel/api/rooms', type='http', auth='public', methods=['GET'], csrf=False)
+    def api_rooms(self, hostel=None, available=None, after=0, limit=100, **kwargs):
+        domain = []
+        if hostel:
+            domain.append(('hostel_id.hostel_code', '=', hostel))
+        if available in ('1', 'true', 'True'):
+            domain.append(('availability', '>', 0))
+        return self._paginated_response(
+            'hostel.room', domain, ['name', 'room_no', 'floor_no', 'hostel_id', 'student_per_room', 'availability'], after, limit,
+        )
+
+    # =======
+    # Helpers
+    # =======
+
+    def _get_validators(self, model, domain, query_key):
+        """
+        Calcule (etag, last_modified) pour le filtre demandé en une requête d'agrégat.
+        """
+        [(last_modified, count)] = model._read_group(domain, [], ['write_date:max', '__count'])
+        digest = hashlib.sha1(f"{model._name}|{query_key}|{last_modified}|{count}".encode()).hexdigest()
+        return f'"{digest}"', last_modified
+
+    def _is_not_modified(self, etag, last_modified):
+        if_none_match = request.httprequest.headers.get('If-None-Match')
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = parse_date(request.httprequest.headers.get('If-Modified-Since'))
+        if if_modified_since and last_modified:
+            # Les dates HTTP sont à la seconde près.
+            return last_modified.replace(microsecond=0) <= if_modified_since.replace(tzinfo=None)
+        return False
+
+    def _add_hostel_image_url(self, record):
+        """
+        Remplace 'write_date' par l'URL de la miniature 128 px, versionnée par la date de modification.
+        """
+        unique = int(record.pop('write_date').timestamp())
+        record['image_url'] = f"/hostel/api/hostels/{record['id']}/image/128?unique={unique}"
+
+    def _paginated_response(self, model_name, domain, field_names, after, limit, postprocess=None):
+        try:
+            after = max(int(after), 0)
+            limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return request.make_json_response({'error': "Invalid 'after' or 'limit' parameter"}, status=400)
+
+        # Données publiques : on passe en sudo mais on ne renvoie que les champs listés ci-dessus.
+        model = request.env[model_name].sudo()
+        etag, last_modified = self._get_validators(model, domain, request.httprequest.query_string.decode())
+        headers = [('ETag', etag), ('Cache-Control', 'public, no-cache')]
+        if last_modified:
+            headers.append(('Last-Modified', http_date(last_modified)))
+        if self._is_not_modified(etag, last_modified):
+            return request.make_response('', headers=headers, status=304)
+
+        # On lit un enregistrement de plus que la page pour savoir s'il existe une page suivante.
+        records = model.search_read(domain + [('id', '>', after)], field_names, order='id', limit=limit + 1)
+        next_after = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_after = records[-1]['id']
+        for record in records:
+            for field_name, value in record.items():
+                # Many2one : (id, display_name) -> on ne garde que l'id
+                if isinstance(value, tuple):
+                    record[field_name] = value[0]
+            if postprocess:
+                postprocess(record)
+        return request.make_json_response({'items': records, 'next_after': next_after}, headers=headers)
@@ -1,5 +1,13 @@
+from . import hostel_perf
+from . import hostel_postcode
+from . import hostel_reference_cache
+from . import hostel_trigram_search
 from . import hostel
 from . import hotel_room
 from . import hostel_student
 from . import hostel_amenities
 from . import hostel_categ
+from . import hostel_import
+from . import hostel_rent
+from . import hostel_stay_history
+from . import hostel_job
@@ -1,8 +1,24 @@
+import math
+
 from odoo import api, fields, models
+from odoo.tools import SQL, create_index
+from .hostel_perf import hostel_profiled
+
+# Rayon moyen de la Terre (km) et longueur d'un degré de latitude (km)
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.045
+
+# Table (sans modèle) des deltas de cumuls des hostels, en ajout seul, intégrés par l'action planifiée (cf. _fold_rollup_deltas())
+ROLLUP_DELTA_TABLE = 'hostel_hostel_rollup_delta'
 
 class Hostel(models.Model):
     _name = 'hostel.hostel'
+    _inherit = ['hostel.trigram.search.mixin']
     _description = "Information about hostel"
+    _rec_names_search = ['name', 'hostel_code']
+
+    # Autocomplétion : recherche floue sur le nom, le code et la ville (cf. hostel.trigram.search.mixin).
+    _trigram_search_fields = ['name', 'hostel_code', 'city']
 
     # ==============
     # Champs simples
@@ -18,7 +34,7 @@ class Hostel(models.Model):
     mobile = fields.Char(string="Mobile", required=True)
     email = fields.Char(string="Email")
     hostel_floors = fields.Integer(string="Total Floors")
-    image = fields.Binary(string="Hostel Image")
+    image = fields.Image(string="Hostel Image", max_width=1920, max_height=1920)
     active = fields.Boolean(string="Active", default=True, help="Activate/Deactivate hosteel record")
     type = fields.Selection(selection=[("male", "Boys"), ("female", "Girls"), ("common", "Common")], help="Type of Hostel", required=True, default="common")
     other_info = fields.Text(string="Other Information", help="Enter more information")
@@ -28,6 +44,39 @@ class Hostel(models.Model):
                                 digits='Rating Value'
                                 )
 
+    # ====================
+    # Variantes de l'image
+    # ====================
+
+    """
+L'image d'origine peut peser plusieurs Mo : la lire dans une liste, un kanban ou l'API est très coûteux.
+On stocke donc des versions réduites (related + store=True), calculées une seule fois quand l'image est écrite.
+Les vues liste/kanban et l'API utilisent 'image_128' (ou 'image_256'), le formulaire n'affiche l'image complète qu'à l'ouverture.
+Les fichiers sont servis avec un cache long (cf. HostelApi.api_hostel_image()).
+    """
+
+    image_1024 = fields.Image(string="Image 1024", related="image", max_width=1024, max_height=1024, store=True)
+    image_256 = fields.Image(string="Image 256", related="image", max_width=256, max_height=256, store=True)
+    image_128 = fields.Image(string="Image 128", related="image", max_width=128, max_height=128, store=True)
+
+    # ===============
+    # Géolocalisation
+    # ===============
+
+    # Remplies depuis la table locale des codes postaux (cf. hostel.postcode) quand le code postal ou le pays change.
+    # Elles restent modifiables à la main pour une position plus précise.
+    latitude = fields.Float(
+        string="Latitude", digits=(10, 7), compute='_compute_geolocation', store=True, readonly=False,
+    )
+    longitude = fields.Float(
+        string="Longitude", digits=(10, 7), compute='_compute_geolocation', store=True, readonly=False,
+    )
+    # Un Float vide est enregistré à 0.0 : sans ce drapeau, un hostel sans coordonnées serait placé au point (0, 0).
+    geolocated = fields.Boolean(
+        string="Geolocated", compute='_compute_geolocated', store=True,
+        help="The coordinates are known: hostels that are not geolocated are left out of the geographic search",
+    )
+
     # ===================
     # Champs relationnels
     # ===================
@@ -36,17 +85,83 @@ class Hostel(models.Model):
     country_id = fields.Many2one(string="Country", comodel_name="res.country")
     category_id = fields.Many2one(string="Category", comodel_name="hostel.category")
 
+    # ===========================
+    # Cumuls (chambres et loyers)
+    # ===========================
+
+    """
+Ces champs évitent de charger toutes les chambres d'un hostel pour connaitre sa capacité, son occupation et son loyer attendu.
+Ce ne sont pas des champs compute : ils sont tenus à jour par deltas (cf. _apply_rollup_deltas()).
+
+À la première modification d'une chambre dans une transaction (création, suppression, changement d'hostel, de capacité, de loyer,
+ou de ses occupants), on mémorise sa "contribution" à son hostel : (1 chambre, lits, lits occupés, loyer si la chambre est occupée).
+En fin de transaction, on relit la contribution de ces seules chambres, et on enregistre pour chaque hostel la différence après - avant.
+On ne recompte donc jamais toutes les chambres d'un hostel.
+
+Les deltas ne sont pas appliqués directement à la ligne de l'hostel : toutes les réservations et tous les changements de chambre
+d'un même hostel se bloqueraient sur cette ligne (puis échoueraient en erreur de sérialisation). Ils sont ajoutés (INSERT seul, sans verrou
+sur l'hostel) à la table ROLLUP_DELTA_TABLE, et l'action planifiée _cron_refresh_rollups() les intègre aux hostels toutes les 5 minutes.
+Les cumuls affichés ont donc jusqu'à quelques minutes de retard ; la disponibilité des chambres, elle, est toujours exacte.
+
+Le loyer attendu est la somme des loyers des chambres occupées (le loyer d'une chambre est partagé entre ses occupants),
+exprimé dans la devise des chambres.
+    """
+
+    # Valeur par défaut explicite : les deltas s'ajoutent à 0, pas à NULL, pour les hostels créés après l'installation.
+    room_count = fields.Integer(string="Rooms", readonly=True, default=0)
+    bed_count = fields.Integer(string="Beds", readonly=True, default=0)
+    occupied_bed_count = fields.Integer(string="Occupied Beds", readonly=True, default=0)
+    expected_monthly_rent = fields.Float(
+        string="Expected Monthly Rent",
+        readonly=True,
+        default=0.0,
+        help="Sum of the monthly rent of the occupied rooms",
+    )
+
     # =========
     # Overrides
     # =========
 
+    # Champs repris dans le cache des données de référence (cf. hostel.reference.cache)
+    _REFERENCE_CACHE_FIELDS = {'name', 'hostel_code', 'type'}
+
+    @api.model_create_multi
+    @hostel_profiled('call')
+    def create(self, vals_list):
+        self.env['hostel.reference.cache']._invalidate()
+        return super().create(vals_list)
+
+    @hostel_profiled('call')
+    def write(self, vals):
+        if self._REFERENCE_CACHE_FIELDS & vals.keys():
+            self.env['hostel.reference.cache']._invalidate()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['hostel.reference.cache']._invalidate()
+        return super().unlink()
+
+    @api.model
+    def _format_display_name(self, name, hostel_code):
+        if not name:
+            return False
+        return f'{name} ({hostel_code})' if hostel_code else name
+
     @api.depends('name', 'hostel_code')
+    @hostel_profiled('compute')
     def _compute_display_name(self):
         """
         Override de la méthode pour modifier le champ 'display_name' du modèle.
+
+        Les hostels enregistrés en base prennent leur nom affiché dans le cache des données de référence (cf. hostel.reference.cache) :
+        les Many2one 'hostel_id' des écrans de chambres et d'étudiants n'ont alors pas besoin de relire les hostels.
         """
+        stored = self.filtered(lambda record: isinstance(record.id, int))
+        cached = self.env['hostel.reference.cache']._get_hostel_info(stored.ids) if stored else {}
         for record in self:
-            if record.name:
+            if record.id in cached:
+                record.display_name = cached[record.id][0]
+            elif record.name:
                 name = record.name
                 if record.hostel_code:
                     name = f'{name} ({record.hostel_code})'
@@ -57,4 +172,254 @@ class Hostel(models.Model):
             else:
                 record.display_name = False
 
+    # ======================
+    # Mise à jour des cumuls
+    # ======================
+
+    _ROLLUP_SNAPSHOT_KEY = 'hostel.hostel.rollup_snapshots'
+
+    @api.model
+    def _read_room_contributions(self, room_ids):
+        """
+        Lit en base la contribution de chaque chambre à son hostel : {room_id: (hostel_id, chambres, lits, lits occupés, loyer)}.
+        Une chambre qui n'existe pas (ou plus) ne contribue à rien.
+        """
+        contributions = dict.fromkeys(room_ids, (None, 0, 0, 0, 0.0))
+        if room_ids:
+            self.env.cr.execute(
+                """
+                SELECT id, hostel_id, student_per_room, occupied_beds,
+                       CASE WHEN occupied_beds > 0 THEN COALESCE(rent_amount, 0) ELSE 0 END
+                  FROM hostel_room
+                 WHERE id IN %s
+                """,
+                (tuple(room_ids),),
+            )
+            for room_id, hostel_id, beds, occupied, rent in self.env.cr.fetchall():
+                contributions[room_id] = (hostel_id, 1, beds or 0, occupied or 0, float(rent))
+        return contributions
+
+    @api.model
+    def _snapshot_room_contributions(self, rooms, new=False):
+        """
+        Mémorise (une seule fois par transaction) la contribution des chambres avant leur modification,
+        et programme l'application des deltas en fin de transaction.
+        'new' indique des chambres qui viennent d'être créées : leur contribution "avant" est nulle.
+        """
+        if not rooms.ids:
+            return
+        precommit = self.env.cr.precommit
+        if self._ROLLUP_SNAPSHOT_KEY not in precommit.data:
+            precommit.add(self.sudo()._apply_rollup_deltas)
+        snapshots = precommit.data.setdefault(self._ROLLUP_SNAPSHOT_KEY, {})
+        missing = [room_id for room_id in rooms.ids if room_id not in snapshots]
+        if new:
+            snapshots.update(dict.fromkeys(missing, (None, 0, 0, 0, 0.0)))
+        else:
+            snapshots.update(self._read_room_contributions(missing))
+
+    @api.model
+    def _apply_rollup_deltas(self):
+        """
+        Enregistre en une requête les deltas (contribution après - contribution avant) des chambres modifiées, par hostel,
+        dans ROLLUP_DELTA_TABLE. La ligne de l'hostel n'est ni modifiée ni verrouillée (cf. _fold_rollup_deltas()).
+        """
+        snapshots = self.env.cr.precommit.data.pop(self._ROLLUP_SNAPSHOT_KEY, {})
+        if not snapshots:
+            return
+        self.env['hostel.room'].flush_model(['hostel_id', 'student_per_room', 'occupied_beds', 'rent_amount'])
+        after = self._read_room_contributions(list(snapshots))
+
+        deltas = {}
+        for room_id, before in snapshots.items():
+            for (hostel_id, *values), sign in ((before, -1), (after[room_id], 1)):
+                if hostel_id:
+                    delta = deltas.setdefault(hostel_id, [0, 0, 0, 0.0])
+                    for index, value in enumerate(values):
+                        delta[index] += sign * value
+        deltas = {hostel_id: delta for hostel_id, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return
+
+        values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(deltas))
+        params = [value for hostel_id, delta in deltas.items() for value in (hostel_id, *delta)]
+        self.env.cr.execute(
+            f"INSERT INTO {ROLLUP_DELTA_TABLE} (hostel_id, rooms, beds, occupied, rent) VALUES {values}",
+            params,
+        )
+
+    @api.model
+    def _fold_rollup_deltas(self):
+        """
+        Intègre aux hostels, en une requête, les deltas enregistrés par les transactions validées, et les supprime.
+        Les deltas validés pendant l'exécution ne sont pas vus (ni supprimés) : ils le seront au passage suivant.
+        """
+        self.env.cr.execute(f"""
+            WITH folded AS (
+                DELETE FROM {ROLLUP_DELTA_TABLE}
+                  RETURNING hostel_id, rooms, beds, occupied, rent
+            ),
+            sums AS (
+                SELECT hostel_id, SUM(rooms) AS rooms, SUM(beds) AS beds, SUM(occupied) AS occupied, SUM(rent) AS rent
+                  FROM folded
+              GROUP BY hostel_id
+            )
+            UPDATE hostel_hostel h
+               SET room_count = COALESCE(h.room_count, 0) + s.rooms,
+                   bed_count = COALESCE(h.bed_count, 0) + s.beds,
+                   occupied_bed_count = COALESCE(h.occupied_bed_count, 0) + s.occupied,
+                   expected_monthly_rent = COALESCE(h.expected_monthly_rent, 0) + s.rent
+              FROM sums s
+             WHERE h.id = s.hostel_id
+        """)
+        self.invalidate_model(['room_count', 'bed_count', 'occupied_bed_count', 'expected_monthly_rent'])
+
+    @api.model
+    def _cron_refresh_rollups(self):
+        """
+        Intègre les deltas aux hostels, puis recalcule les cumuls des catégories à partir de ceux des hostels (cf. hostel.category).
+        """
+        self._fold_rollup_deltas()
+        self.env['hostel.category']._refresh_all_rollups()
+
+    @api.model
+    def _recompute_all_rollups(self):
+        """
+        Recalcul complet des cumuls de tous les hostels (installation / mise à jour du module, cf. data/data.xml).
+        En fonctionnement normal, les cumuls sont tenus à jour par deltas : ceux en attente sont compris dans le recalcul.
+        """
+        self.env['hostel.room'].flush_model(['hostel_id', 'student_per_room', 'occupied_beds', 'rent_amount'])
+        self.env.cr.execute(
+            f"""
+            DELETE FROM {ROLLUP_DELTA_TABLE};
+            UPDATE hostel_hostel h
+               SET room_count = COALESCE(s.rooms, 0),
+                   bed_count = COALESCE(s.beds, 0),
+                   occupied_bed_count = COALESCE(s.occupied, 0),
+                   expected_monthly_rent = COALESCE(s.rent, 0)
+              FROM hostel_hostel h2
+         LEFT JOIN (
+                    SELECT hostel_id,
+                           COUNT(*) AS rooms,
+                           SUM(student_per_room) AS beds,
+                           SUM(occupied_beds) AS occupied,
+                           SUM(CASE WHEN occupied_beds > 0 THEN COALESCE(rent_amount, 0) ELSE 0 END) AS rent
+                      FROM hostel_room
+                     WHERE hostel_id IS NOT NULL
+                  GROUP BY hostel_id
+                   ) s ON s.hostel_id = h2.id
+             WHERE h.id = h2.id
+            """
+        )
+        self.invalidate_model(['room_count', 'bed_count', 'occupied_bed_count', 'expected_monthly_rent'])
+
+    # ======================
+    # Recherche géographique
+    # ======================
+
+    """
+Recherche des hostels les plus proches d'un point (latitude, longitude), par exemple "l'hostel le plus proche avec un lit libre".
+
+1) Élagage : un index GiST sur point(longitude, latitude) des hostels géolocalisés sert la recherche des hostels dans le rectangle
+   (bounding box) qui entoure le cercle de rayon 'radius_km'. Seuls ces candidats sont lus, même avec des milliers d'hostels.
+2) Classement : la distance réelle (formule de haversine) est calculée en SQL pour ces seuls candidats ;
+   ceux du rectangle qui sont hors du cercle (les coins) sont écartés, les autres triés par distance.
+
+Le domaine (droits d'accès, règles, filtres de l'appelant) est traduit en SQL par _search() dans la même requête :
+la limite s'applique en SQL après tous les filtres.
+
+Le filtre de disponibilité utilise les cumuls stockés de l'hostel (bed_count > occupied_bed_count), sans lire les chambres.
+    """
+
+    def init(self):
+        super().init()
+        # Deltas des cumuls (cf. _apply_rollup_deltas()) : pas de clé étrangère, l'insertion ne verrouille pas la ligne de l'hostel.
+        self.env.cr.execute(f"""
+            CREATE TABLE IF NOT EXISTS {ROLLUP_DELTA_TABLE} (
+                hostel_id integer NOT NULL,
+                rooms integer NOT NULL,
+                beds integer NOT NULL,
+                occupied integer NOT NULL,
+                rent numeric NOT NULL
+            )
+        """)
+        create_index(
+            self.env.cr,
+            indexname='hostel_hostel_geolocation_index',
+            tablename=self._table,
+            expressions=['point(longitude, latitude)'],
+            method='gist',
+            where='geolocated',
+        )
+
+    @api.depends('zip', 'country_id')
+    def _compute_geolocation(self):
+        # Une seule requête pour tous les codes postaux des hostels de self.
+        zips = {hostel.zip.strip() for hostel in self if hostel.zip}
+        centroids = {}
+        for postcode in self.env['hostel.postcode'].search_read([('zip', 'in', list(zips))], ['zip', 'country_id', 'latitude', 'longitude']):
+            centroids[(postcode['zip'], postcode['country_id'][0])] = (postcode['latitude'], postcode['longitude'])
+            # Sans pays sur l'hostel, on prend le premier pays trouvé pour ce code postal.
+            centroids.setdefault((postcode['zip'], False), (postcode['latitude'], postcode['longitude']))
+        for hostel in self:
+            key = ((hostel.zip or '').strip(), hostel.country_id.id)
+            hostel.latitude, hostel.longitude = centroids.get(key, (0.0, 0.0))
+
+    @api.depends('latitude', 'longitude')
+    def _compute_geolocated(self):
+        # Coordonnées du code postal ou saisies à la main. Le point (0, 0), en plein océan, signifie "pas de coordonnées".
+        for hostel in self:
+            hostel.geolocated = bool(hostel.latitude or hostel.longitude)
+
+    @api.model
+    def _geolocate_missing(self):
+        """
+        Géolocalise les hostels sans coordonnées (à l'installation / mise à jour du module, cf. data/data.xml),
+        une fois la table des codes postaux chargée.
+        """
+        hostels = self.with_context(active_test=False).search([('geolocated', '=', False), ('zip', '!=', False)])
+        self.env.add_to_compute(self._fields['latitude'], hostels)
+        self.env.add_to_compute(self._fields['longitude'], hostels)
+        # 'geolocated' suit les coordonnées (cf. _compute_geolocated()).
+        hostels.flush_recordset(['latitude', 'longitude', 'geolocated'])
+
+    @api.model
+    def search_nearest(self, latitude, longitude, radius_km=50.0, limit=10, available=False, domain=None):
+        """
+        Retourne les hostels actifs à moins de 'radius_km' km du point, du plus proche au plus lointain,
+        sous forme de liste [(hostel, distance en km)].
+
+        'available' : seulement les hostels avec au moins un lit libre.
+        'domain' : filtre supplémentaire (appliqué avec les droits d'accès de l'utilisateur).
+
+        Exemple :
+        self.env['hostel.hostel'].search_nearest(48.85, 2.35, radius_km=20, limit=1, available=True)
+        """
+        self.flush_model(['latitude', 'longitude', 'geolocated', 'bed_count', 'occupied_bed_count'])
+        delta_latitude = radius_km / KM_PER_DEGREE
+        # Un degré de longitude raccourcit vers les pôles ; on borne le cosinus pour ne pas diviser par zéro.
+        delta_longitude = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+        table = f'"{self._table}"'
+        # Haversine : avec les arrondis, l'argument de asin() peut dépasser 1 de peu pour deux points opposés, d'où le LEAST.
+        distance = SQL(
+            f"""2 * %s * asin(LEAST(1.0, sqrt(
+                    power(sin(radians({table}.latitude - %s) / 2), 2)
+                    + cos(radians(%s)) * cos(radians({table}.latitude)) * power(sin(radians({table}.longitude - %s) / 2), 2)
+                )))""",
+            EARTH_RADIUS_KM, latitude, latitude, longitude,
+        )
+        # Droits d'accès, règles, hostels actifs et domaine : traduits en SQL par l'ORM, avec la limite.
+        query = self._search(domain or [], limit=limit)
+        query.add_where(SQL(f"{table}.geolocated"))
+        query.add_where(SQL(
+            f"point({table}.longitude, {table}.latitude) <@ box(point(%s, %s), point(%s, %s))",
+            longitude - delta_longitude, latitude - delta_latitude, longitude + delta_longitude, latitude + delta_latitude,
+        ))
+        if available:
+            query.add_where(SQL(f"{table}.bed_count > {table}.occupied_bed_count"))
+        query.add_where(SQL("%s <= %s", distance, radius_km))
+        query.order = SQL(f"%s, {table}.id", distance)
+        self.env.cr.execute(query.select(SQL(f"{table}.id"), distance))
+        return [(self.browse(hostel_id), hostel_distance) for hostel_id, hostel_distance in self.env.cr.fetchall()]
+
 # test
@@ -1,4 +1,4 @@
-from odoo import fields, models
+from odoo import api, fields, models
 
 class HostelAmenities(models.Model):
     _name = 'hostel.amenities'
@@ -6,3 +6,33 @@ class HostelAmenities(models.Model):
 
     name = fields.Char(string="Name", help="Provided Hostel Amenity")
     active = fields.Boolean(string="Active", help="Activate/Deactivate whether the amenity should be given or not")
+
+    # =========
+    # Overrides
+    # =========
+
+    # Les équipements actifs sont gardés dans le cache des données de référence (cf. hostel.reference.cache).
+
+    @api.depends('name')
+    def _compute_display_name(self):
+        """
+        Override de la méthode : le nom affiché des équipements actifs (étiquettes des chambres et des préférences des étudiants)
+        est lu dans le cache des données de référence, sans relire les équipements.
+        """
+        names = dict(self.env['hostel.reference.cache']._get_active_amenities())
+        for record in self:
+            record.display_name = names.get(record.id, record.name) if isinstance(record.id, int) else record.name
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['hostel.reference.cache']._invalidate()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if {'name', 'active'} & vals.keys():
+            self.env['hostel.reference.cache']._invalidate()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['hostel.reference.cache']._invalidate()
+        return super().unlink()
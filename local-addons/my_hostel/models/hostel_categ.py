@@ -1,5 +1,7 @@
 from odoo import api, fields, models
 from odoo.exceptions import ValidationError
+from odoo.tools import create_index
+from .hostel_perf import hostel_profiled
 
 class HostelCateg(models.Model):
     _name = 'hostel.category'
@@ -108,7 +110,31 @@ Si on travail avec un modèle où il y a beaucoup de modifications (create/write
         inverse_name="parent_id",
     )
 
+    # ============================================
+    # Cumuls (catégorie + toutes ses descendantes)
+    # ============================================
+
+    # Ces champs ne sont pas des champs compute : une dépendance "sur tous les descendants" ne peut pas s'exprimer avec @api.depends.
+    # Ils sont recalculés en SQL à partir des cumuls des hostels par l'action planifiée (cf. _refresh_all_rollups()).
+    hostel_count = fields.Integer(string="Hostels", readonly=True, help="Active hostels in this category and its sub-categories")
+    room_count = fields.Integer(string="Rooms", readonly=True, help="Rooms in this category and its sub-categories")
+    bed_count = fields.Integer(string="Beds", readonly=True, help="Beds in this category and its sub-categories")
+    occupied_bed_count = fields.Integer(string="Occupied Beds", readonly=True, help="Occupied beds in this category and its sub-categories")
+
+    def init(self):
+        """
+        Les recherches par préfixe (parent_path LIKE '1/2/%') ne peuvent utiliser un index btree classique que si celui-ci
+        est créé avec l'opérateur 'text_pattern_ops' (sinon la collation de la base l'en empêche).
+        """
+        create_index(
+            self.env.cr,
+            indexname='hostel_category_parent_path_prefix_index',
+            tablename=self._table,
+            expressions=['parent_path text_pattern_ops'],
+        )
+
     @api.constrains('parent_id')
+    @hostel_profiled('constraint')
     def _check_hierarchy(self):
         """
         J'ai bien l'impression que cette méthode est inutile.
@@ -122,3 +148,170 @@ Si on travail avec un modèle où il y a beaucoup de modifications (create/write
         """
         if not self._check_recursion():
             raise models.ValidationError('Error. You cannot create recursive categories.')
+
+    @api.depends('name', 'parent_id')
+    def _compute_display_name(self):
+        """
+        Override de la méthode pour que 'display_name' soit le chemin complet de la catégorie ("Racine / Enfant / Catégorie").
+
+        Les noms des ancêtres sont pris dans l'arbre des catégories du cache des données de référence (cf. hostel.reference.cache) :
+        afficher le Many2one 'category_id' des hostels ne relit pas les catégories parentes.
+        """
+        names = {category_id: name for category_id, name, _parent_id, _path in self.env['hostel.reference.cache']._get_category_tree()}
+        for record in self:
+            path_ids = [int(category_id) for category_id in (record.parent_path or '').strip('/').split('/') if category_id]
+            if isinstance(record.id, int) and path_ids and all(category_id in names for category_id in path_ids):
+                record.display_name = " / ".join(names[category_id] or '' for category_id in path_ids)
+            else:
+                record.display_name = record.name
+
+    # ==========================
+    # Déplacement de sous-arbres
+    # ==========================
+
+    """
+Déplacer une branche avec l'ORM (write({'parent_id': ...})) fait recalculer le parent_path de chaque descendant par _parent_store_update,
+puis relance _check_hierarchy / _check_recursion. Avec des milliers de descendants, c'est long.
+
+Or tous les descendants d'une catégorie partagent le même préfixe de parent_path : celui de la catégorie déplacée.
+Déplacer la branche revient donc à remplacer ce préfixe, ce que l'on peut faire en une seule requête SQL :
+
+    ancien chemin de la catégorie 5 : 1/2/5/          descendant : 1/2/5/8/13/
+    nouveau parent (chemin 1/7/)    : 1/7/5/          descendant : 1/7/5/8/13/
+
+La détection de cycle se fait elle aussi avec parent_path : on ne peut pas déplacer une catégorie sous l'un de ses descendants,
+c'est à dire sous une catégorie dont le chemin commence par le chemin de la catégorie déplacée.
+    """
+
+    def move_subtree(self, new_parent):
+        """
+        Déplace les catégories de self (et toutes leurs sous-catégories) sous 'new_parent' (catégorie vide = racine).
+        Chaque branche est déplacée par une seule requête UPDATE qui réécrit 'parent_id' de la racine de la branche
+        et le préfixe du 'parent_path' de tous ses descendants.
+        """
+        new_parent = new_parent or self.browse()
+        if new_parent:
+            new_parent.ensure_one()
+        # Les requêtes SQL ne passent pas par write() : les droits d'écriture sont vérifiés ici, avant toute modification.
+        self.check_access_rights('write')
+        (self | new_parent).check_access_rule('write')
+        # L'arbre en cache est invalidé ici, avant tout verrou sur hostel_category (y compris le flush) :
+        # le verrou des données de référence est toujours pris en premier (cf. hostel.reference.cache._invalidate()).
+        self.env['hostel.reference.cache']._invalidate()
+        self.flush_model(['parent_id', 'parent_path'])
+
+        # Validation des cycles, une fois pour toutes, avant toute écriture.
+        if new_parent and any(new_parent.parent_path.startswith(category.parent_path) for category in self):
+            raise ValidationError('Error. You cannot create recursive categories.')
+
+        for category in self:
+            # Les chemins peuvent avoir changé si une catégorie précédente de self contenait celle-ci (ou le nouveau parent).
+            self.invalidate_model(['parent_path'])
+            old_prefix = category.parent_path
+            new_prefix = f"{new_parent.parent_path if new_parent else ''}{category.id}/"
+            self.env.cr.execute(
+                """
+                UPDATE hostel_category
+                   SET parent_path = %(new_prefix)s || substr(parent_path, %(cut)s),
+                       parent_id = CASE WHEN id = %(category_id)s THEN %(parent_id)s ELSE parent_id END,
+                       write_uid = %(uid)s,
+                       write_date = (now() at time zone 'UTC')
+                 WHERE parent_path LIKE %(pattern)s
+                """,
+                {
+                    'new_prefix': new_prefix,
+                    'cut': len(old_prefix) + 1,
+                    'category_id': category.id,
+                    'parent_id': new_parent.id or None,
+                    'uid': self.env.uid,
+                    'pattern': f"{old_prefix}%",
+                },
+            )
+
+        self.invalidate_model(['parent_id', 'parent_path', 'child_ids', 'display_name', 'write_uid', 'write_date'])
+        return True
+
+    # =========
+    # Overrides
+    # =========
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['hostel.reference.cache']._invalidate()
+        return super().create(vals_list)
+
+    def unlink(self):
+        self.env['hostel.reference.cache']._invalidate()
+        return super().unlink()
+
+    def write(self, vals):
+        if {'name', 'parent_id'} & vals.keys():
+            self.env['hostel.reference.cache']._invalidate()
+        return super().write(vals)
+
+    # ======================
+    # Mise à jour des cumuls
+    # ======================
+
+    """
+Les cumuls d'une catégorie portent sur elle-même et toutes ses descendantes.
+Grâce à parent_path, pas besoin de parcourir l'arbre en Python :
+
+1) on agrège par catégorie les cumuls des hostels actifs (cf. hostel.hostel.room_count...), sans relire leurs chambres ;
+2) le parent_path de chaque catégorie ('1/2/5/') donne directement la liste de ses ancêtres : en "dépliant" ce chemin (unnest),
+   chaque agrégat est ajouté à la catégorie elle-même et à tous ses ancêtres ;
+3) on ne réécrit que les catégories dont les cumuls ont changé.
+
+Le recalcul n'est fait que par l'action planifiée (cf. hostel.hostel._cron_refresh_rollups()), jamais dans la transaction
+qui modifie un hostel, une chambre, un étudiant ou l'arbre : ces transactions ne verrouillent donc pas les catégories ancêtres,
+et les cumuls ont jusqu'à quelques minutes de retard. Une requête groupée sur les hostels reste peu coûteuse :
+il y a beaucoup moins d'hostels que de chambres.
+    """
+
+    @api.model
+    def _refresh_all_rollups(self):
+        """
+        Recalcule en une requête les cumuls de toutes les catégories à partir des cumuls des hostels
+        (action planifiée, et installation / mise à jour du module, cf. data/data.xml).
+        """
+        self.env['hostel.hostel'].flush_model(['category_id', 'active', 'room_count', 'bed_count', 'occupied_bed_count'])
+        self.flush_model(['parent_path'])
+        # Pas de deadlock avec move_subtree() : verrou partagé des données de référence d'abord (cf. hostel.reference.cache._invalidate()).
+        self.env['hostel.reference.cache']._lock_reference_data(shared=True)
+        self.env.cr.execute(
+            """
+            WITH category_stats AS (
+                SELECT c.parent_path,
+                       COUNT(*) AS hostel_count,
+                       SUM(COALESCE(h.room_count, 0)) AS room_count,
+                       SUM(COALESCE(h.bed_count, 0)) AS bed_count,
+                       SUM(COALESCE(h.occupied_bed_count, 0)) AS occupied_bed_count
+                  FROM hostel_hostel h
+                  JOIN hostel_category c ON c.id = h.category_id
+                 WHERE h.active
+              GROUP BY c.id, c.parent_path
+            ),
+            rollups AS (
+                SELECT ancestor.id::int AS id,
+                       SUM(s.hostel_count) AS hostel_count,
+                       SUM(s.room_count) AS room_count,
+                       SUM(s.bed_count) AS bed_count,
+                       SUM(s.occupied_bed_count) AS occupied_bed_count
+                  FROM category_stats s
+            CROSS JOIN LATERAL unnest(string_to_array(rtrim(s.parent_path, '/'), '/')) AS ancestor(id)
+              GROUP BY ancestor.id
+            )
+            UPDATE hostel_category c
+               SET hostel_count = COALESCE(r.hostel_count, 0),
+                   room_count = COALESCE(r.room_count, 0),
+                   bed_count = COALESCE(r.bed_count, 0),
+                   occupied_bed_count = COALESCE(r.occupied_bed_count, 0)
+              FROM hostel_category c2
+         LEFT JOIN rollups r ON r.id = c2.id
+             WHERE c.id = c2.id
+               AND (c.hostel_count, c.room_count, c.bed_count, c.occupied_bed_count)
+                   IS DISTINCT FROM (COALESCE(r.hostel_count, 0), COALESCE(r.room_count, 0),
+                                     COALESCE(r.bed_count, 0), COALESCE(r.occupied_bed_count, 0))
+            """
+        )
+        self.invalidate_model(['hostel_count', 'room_count', 'bed_count', 'occupied_bed_count'])
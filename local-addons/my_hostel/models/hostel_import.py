@@ -0,0 +1,286 @@
+import csv
+import json
+import logging
+from itertools import islice
+
+from odoo import api, fields, models
+from odoo.exceptions import AccessError
+
+_logger = logging.getLogger(__name__)
+
+
+class HostelImport(models.AbstractModel):
+    _name = 'hostel.import'
+    _description = "Streaming importer for hostels, rooms and students."
+
+    """
+Import en flux des hostels, chambres et étudiants (import nocturne depuis le système d'information des étudiants).
+
+L'import standard d'Odoo crée les enregistrements un par un et garde tout le fichier en mémoire. Ici :
+- le fichier (CSV ou JSON Lines, un objet JSON par ligne) est lu ligne à ligne, par paquets de 'chunk_size' lignes ;
+- les références 'hostel_code' (chambres) et 'room_no' (étudiants) sont résolues par un index en mémoire {code: id},
+  construit en une requête au début de l'import (il ne contient que des codes, pas des enregistrements) ;
+- chaque paquet est validé en une fois (champs requis, types, loyer positif) puis créé par un seul create() ;
+- si le create() du paquet échoue (contrainte SQL, contrainte Python), le paquet est rejoué ligne par ligne dans des savepoints
+  pour savoir exactement quelles lignes posent problème ;
+- le cache de l'ORM est vidé après chaque paquet : la mémoire reste stable quelle que soit la taille du fichier.
+
+Le fichier est lu sur le serveur : l'import n'est pas exposé aux clients (méthodes privées) et il est réservé aux managers.
+
+Exemple (depuis un shell Odoo ou une action planifiée) :
+
+    report = env['hostel.import']._import_file('student', '/data/students.csv')
+    report --> {'created': 9998, 'failed': 2, 'errors': [(12, "Unknown room_no '999'"), ...]}
+    """
+
+    # Description des colonnes par type d'import : champ -> (type, requis)
+    _IMPORT_COLUMNS = {
+        'hostel': {
+            'name': ('char', True),
+            'hostel_code': ('char', True),
+            'phone': ('char', True),
+            'mobile': ('char', True),
+            'email': ('char', False),
+            'street': ('char', False),
+            'street2': ('char', False),
+            'zip': ('char', False),
+            'city': ('char', False),
+            'hostel_floors': ('integer', False),
+            'type': ('char', False),
+        },
+        'room': {
+            'name': ('char', False),
+            'room_no': ('integer', True),
+            'floor_no': ('integer', False),
+            'student_per_room': ('integer', True),
+            'rent_amount': ('float', False),
+        },
+        'student': {
+            'student_firstname': ('char', False),
+            'student_lastname': ('char', False),
+            'gender': ('char', False),
+            'admission_date': ('date', False),
+            'discharge_date': ('date', False),
+        },
+    }
+
+    _IMPORT_MODELS = {
+        'hostel': 'hostel.hostel',
+        'room': 'hostel.room',
+        'student': 'hostel.student',
+    }
+
+    # ==================
+    # Lecture du fichier
+    # ==================
+
+    @api.model
+    def _read_rows(self, file, file_format):
+        """
+        Générateur qui retourne les lignes du fichier une par une sous forme de (numéro de ligne, dictionnaire).
+        'file' est un objet fichier texte déjà ouvert.
+        Une ligne JSON illisible, ou qui n'est pas un objet, est retournée sous forme de (numéro de ligne, message d'erreur) :
+        elle devient une erreur de ligne dans le rapport (cf. _validate_chunk()) sans interrompre l'import.
+        """
+        if file_format == 'csv':
+            reader = csv.DictReader(file)
+            # La ligne 1 est l'en-tête.
+            for line_no, row in enumerate(reader, start=2):
+                yield line_no, row
+        elif file_format == 'jsonl':
+            for line_no, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as error:
+                    yield line_no, f"Invalid JSON: {error}"
+                    continue
+                if not isinstance(row, dict):
+                    yield line_no, "Invalid JSON: each line must be an object"
+                    continue
+                yield line_no, row
+        else:
+            raise ValueError(f"Unsupported import format: {file_format}")
+
+    # ===================
+    # Index de références
+    # ===================
+
+    @api.model
+    def _build_reference_index(self, kind):
+        """
+        Construit l'index en mémoire des références : {hostel_code: id} pour les chambres, {room_no: id} pour les étudiants.
+        Une seule requête, qui ne ramène que deux colonnes.
+        """
+        if kind == 'room':
+            self.env['hostel.hostel'].flush_model(['hostel_code'])
+            self.env.cr.execute("SELECT hostel_code, id FROM hostel_hostel WHERE hostel_code IS NOT NULL")
+        elif kind == 'student':
+            self.env['hostel.room'].flush_model(['room_no'])
+            self.env.cr.execute("SELECT room_no, id FROM hostel_room WHERE room_no IS NOT NULL")
+        else:
+            return {}
+        return {str(key): record_id for key, record_id in self.env.cr.fetchall()}
+
+    # ==========
+    # Validation
+    # ==========
+
+    @api.model
+    def _convert_value(self, value, value_type):
+        if value is None or value == '':
+            return False
+        if value_type == 'integer':
+            return int(value)
+        if value_type == 'float':
+            return float(value)
+        if value_type == 'date':
+            return fields.Date.to_date(value)
+        return str(value).strip()
+
+    @api.model
+    def _validate_chunk(self, kind, rows, index):
+        """
+        Valide un paquet de lignes en une passe et retourne (liste de (numéro de ligne, vals), liste d'erreurs).
+        """
+        columns = self._IMPORT_COLUMNS[kind]
+        valid, errors = [], []
+        for line_no, row in rows:
+            # Ligne illisible, déjà signalée par _read_rows()
+            if isinstance(row, str):
+                errors.append((line_no, row))
+                continue
+            try:
+                vals = {}
+                for field_name, (value_type, required) in columns.items():
+                    value = self._convert_value(row.get(field_name), value_type)
+                    if required and value is False:
+                        raise ValueError(f"Missing value for '{field_name}'")
+                    if value is not False:
+                        vals[field_name] = value
+
+                if kind == 'room':
+                    if vals.get('rent_amount', 0) < 0:
+                        raise ValueError("The rent amount should be a positive value")
+                    code = row.get('hostel_code')
+                    if code:
+                        if str(code) not in index:
+                            raise ValueError(f"Unknown hostel_code '{code}'")
+                        vals['hostel_id'] = index[str(code)]
+                elif kind == 'student':
+                    room_no = row.get('room_no')
+                    if room_no not in (None, ''):
+                        if str(room_no) not in index:
+                            raise ValueError(f"Unknown room_no '{room_no}'")
+                        vals['room_id'] = index[str(room_no)]
+                valid.append((line_no, vals))
+            except (ValueError, TypeError) as error:
+                errors.append((line_no, str(error)))
+        return valid, errors
+
+    # ======
+    # Import
+    # ======
+
+    @api.model
+    def _create_chunk(self, kind, valid):
+        """
+        Crée un paquet validé en un seul create(). En cas d'échec, rejoue ligne par ligne pour isoler les lignes fautives.
+        Retourne (enregistrements créés, liste d'erreurs).
+        """
+        Model = self.env[self._IMPORT_MODELS[kind]]
+        try:
+            with self.env.cr.savepoint():
+                records = Model.create([vals for _line_no, vals in valid])
+                self.env.flush_all()
+            return records, []
+        except Exception:
+            _logger.info("Import of a %s chunk failed, retrying row by row", kind, exc_info=True)
+            self.env.invalidate_all(flush=False)
+
+        records = Model
+        errors = []
+        for line_no, vals in valid:
+            try:
+                with self.env.cr.savepoint():
+                    record = Model.create(vals)
+                    self.env.flush_all()
+                records |= record
+            except Exception as error:
+                self.env.invalidate_all(flush=False)
+                errors.append((line_no, str(error)))
+        return records, errors
+
+    @api.model
+    def _check_import_access(self):
+        if not self.env.su and not self.env.user.has_group('my_hostel.group_hostel_manager'):
+            raise AccessError("Error. Only hostel managers can import files.")
+
+    @api.model
+    def _import_file(self, kind, file, file_format='csv', chunk_size=1000):
+        """
+        Importe un fichier de hostels ('hostel'), de chambres ('room') ou d'étudiants ('student').
+
+        'file' est un chemin ou un objet fichier texte, 'file_format' vaut 'csv' ou 'jsonl'.
+        Retourne un rapport {'created': int, 'failed': int, 'errors': [(numéro de ligne, message), ...]}.
+        """
+        self._check_import_access()
+        if kind not in self._IMPORT_MODELS:
+            raise ValueError(f"Unsupported import kind: {kind}")
+        if isinstance(file, str):
+            with open(file, newline='', encoding='utf-8') as opened_file:
+                return self._import_file(kind, opened_file, file_format=file_format, chunk_size=chunk_size)
+
+        index = self._build_reference_index(kind)
+        report = {'created': 0, 'failed': 0, 'errors': []}
+        rows = self._read_rows(file, file_format)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            valid, errors = self._validate_chunk(kind, chunk, index)
+            if valid:
+                records, create_errors = self._create_chunk(kind, valid)
+                errors += create_errors
+                report['created'] += len(records)
+            report['failed'] += len(errors)
+            report['errors'] += errors
+            # On libère le cache de l'ORM pour garder une mémoire stable d'un paquet à l'autre.
+            self.env.invalidate_all()
+
+        _logger.info("Import of %s: %s created, %s failed", kind, report['created'], report['failed'])
+        return report
+
+    # ===============
+    # Import en tâche
+    # ===============
+
+    @api.model
+    def _import_file_in_background(self, kind, file, file_format='csv', chunk_size=1000):
+        """
+        Comme _import_file(), mais dans une tâche de fond (cf. hostel.job) : le fichier est seulement lu et découpé ici,
+        chaque paquet est validé et créé par le runner dans sa propre transaction. Le rapport de chaque paquet est
+        enregistré dans le résultat de son morceau. Retourne la tâche.
+        """
+        self._check_import_access()
+        if kind not in self._IMPORT_MODELS:
+            raise ValueError(f"Unsupported import kind: {kind}")
+        if isinstance(file, str):
+            with open(file, newline='', encoding='utf-8') as opened_file:
+                return self._import_file_in_background(kind, opened_file, file_format=file_format, chunk_size=chunk_size)
+        return self.env['hostel.job']._enqueue(
+            f"Import of {kind} records", 'hostel.import', '_run_import_chunk', self._read_rows(file, file_format),
+            chunk_size=chunk_size, kwargs={'kind': kind},
+        )
+
+    @api.model
+    def _run_import_chunk(self, rows, kind):
+        index = self._build_reference_index(kind)
+        valid, errors = self._validate_chunk(kind, rows, index)
+        created = 0
+        if valid:
+            records, create_errors = self._create_chunk(kind, valid)
+            errors += create_errors
+            created = len(records)
+        return {'created': created, 'failed': len(errors), 'errors': errors}
@@ -0,0 +1,311 @@
+import logging
+import time
+from itertools import islice
+
+from psycopg2 import errors
+
+from odoo import api, fields, models
+from odoo.tools import create_index
+
+_logger = logging.getLogger(__name__)
+
+# Taille par défaut d'un morceau (nombre d'éléments traités par transaction)
+JOB_CHUNK_SIZE = 500
+
+# Durée maximale (en secondes) d'un passage du runner, à garder sous la limite de temps des crons (limit_time_real_cron)
+JOB_RUNNER_TIME_LIMIT = 240
+
+# Traitements que le runner accepte d'exécuter : (modèle, méthode). Aucune autre méthode ne peut être mise en tâche.
+JOB_HANDLERS = {
+    ('hostel.job', '_run_recompute_chunk'),
+    ('hostel.import', '_run_import_chunk'),
+}
+
+# Erreurs de concurrence : le morceau n'est pas en faute, il reste en attente et sera rejoué dans une nouvelle transaction
+RETRYABLE_ERRORS = (errors.SerializationFailure, errors.LockNotAvailable)
+
+# Actions planifiées du runner : chacune peut tourner dans un worker différent (cf. data/ir_cron_data.xml)
+JOB_RUNNER_CRONS = ('my_hostel.ir_cron_hostel_job_runner', 'my_hostel.ir_cron_hostel_job_runner_2')
+
+
+class HostelJob(models.Model):
+    _name = 'hostel.job'
+    _description = "Background job split into chunks, run by the hostel job runner."
+    _order = 'id desc'
+
+    """
+Tâches de fond pour les opérations lourdes (recalculs en masse, imports).
+
+Lancées dans la requête HTTP, ces opérations dépassent les limites de temps des workers. Ici :
+- l'opération est découpée à la création en morceaux (hostel.job.chunk) de taille fixe, chacun portant sa part des données (payload) ;
+- chaque morceau est exécuté par 'model_name'.'method_name'(payload, **kwargs) dans un savepoint, puis validé (commit) avec son état :
+  le travail d'un morceau et son passage à 'done' sont dans la même transaction ;
+- après un crash, les morceaux non validés sont toujours 'pending' : le runner reprend au premier morceau non terminé ;
+- un conflit avec une transaction concurrente (RETRYABLE_ERRORS) n'est pas un échec : le morceau reste 'pending' et sera rejoué ;
+- plusieurs workers prennent des morceaux en parallèle : le morceau est verrouillé avec FOR NO KEY UPDATE SKIP LOCKED,
+  chaque worker passe simplement au morceau suivant libre.
+
+L'état et l'avancement de la tâche sont calculés à partir de ses morceaux : les workers n'écrivent jamais la ligne de la tâche
+(sinon ils entreraient en conflit dessus à chaque morceau).
+
+Sécurité :
+- les tâches ne sont créées que par du code serveur (_enqueue() est privée, donc pas appelable en RPC) ;
+- seuls les traitements de JOB_HANDLERS peuvent être exécutés ;
+- chaque morceau est exécuté avec les droits de l'utilisateur qui a créé la tâche (user_id), pas avec ceux de l'action planifiée.
+
+Exemple :
+
+    env['hostel.job']._enqueue("Recompute availability", 'hostel.job', '_run_recompute_chunk', room_ids,
+                              kwargs={'model_name': 'hostel.room', 'field_names': ['occupied_beds', 'availability']})
+    """
+
+    name = fields.Char(string="Name", required=True, readonly=True)
+    model_name = fields.Char(string="Model", required=True, readonly=True)
+    method_name = fields.Char(string="Method", required=True, readonly=True)
+    kwargs = fields.Json(string="Arguments", readonly=True)
+    user_id = fields.Many2one(
+        string="Launched By",
+        comodel_name='res.users',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        default=lambda self: self.env.user,
+    )
+    chunk_ids = fields.One2many(string="Chunks", comodel_name='hostel.job.chunk', inverse_name='job_id', readonly=True)
+    state = fields.Selection(
+        selection=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')],
+        string="Status",
+        compute='_compute_progress',
+    )
+    chunk_count = fields.Integer(string="Chunks", compute='_compute_progress')
+    done_chunk_count = fields.Integer(string="Done Chunks", compute='_compute_progress')
+    failed_chunk_count = fields.Integer(string="Failed Chunks", compute='_compute_progress')
+    progress = fields.Float(string="Progress (%)", compute='_compute_progress')
+
+    # =======
+    # Compute
+    # =======
+
+    def _compute_progress(self):
+        # Une requête groupée pour toutes les tâches affichées.
+        counts = {
+            (job.id, state): count
+            for job, state, count in self.env['hostel.job.chunk']._read_group(
+                [('job_id', 'in', self.ids)], ['job_id', 'state'], ['__count'],
+            )
+        }
+        for job in self:
+            pending = counts.get((job.id, 'pending'), 0)
+            done = counts.get((job.id, 'done'), 0)
+            failed = counts.get((job.id, 'failed'), 0)
+            job.chunk_count = pending + done + failed
+            job.done_chunk_count = done
+            job.failed_chunk_count = failed
+            job.progress = 100.0 * (done + failed) / job.chunk_count if job.chunk_count else 100.0
+            if pending:
+                job.state = 'running' if done or failed else 'pending'
+            else:
+                job.state = 'failed' if failed else 'done'
+
+    # ========
+    # Création
+    # ========
+
+    @api.model
+    def _enqueue(self, name, model_name, method_name, items, chunk_size=JOB_CHUNK_SIZE, kwargs=None):
+        """
+        Crée une tâche qui appellera env[model_name].method_name(payload, **kwargs) pour chaque morceau de 'items',
+        avec les droits de l'utilisateur courant. 'items' est un itérable (lu au fil de l'eau) d'éléments sérialisables en JSON :
+        ids, lignes d'import...
+        """
+        if (model_name, method_name) not in JOB_HANDLERS:
+            raise ValueError(f"Unsupported job handler: {model_name}.{method_name}")
+        # Les tâches et morceaux ne sont pas modifiables par les utilisateurs (cf. ir.model.access.csv) : création en sudo.
+        job = self.sudo().create({
+            'name': name,
+            'model_name': model_name,
+            'method_name': method_name,
+            'kwargs': kwargs or {},
+            'user_id': self.env.uid,
+        })
+        Chunk = self.env['hostel.job.chunk'].sudo()
+        items = iter(items)
+        payloads = iter(lambda: list(islice(items, chunk_size)), [])
+        sequence = 0
+        while True:
+            # Les morceaux sont créés par paquets de 100 pour ne pas garder toutes les données en mémoire.
+            batch = [
+                {'job_id': job.id, 'sequence': sequence + index, 'payload': payload}
+                for index, payload in enumerate(islice(payloads, 100))
+            ]
+            if not batch:
+                break
+            sequence += len(batch)
+            Chunk.create(batch)
+            Chunk.flush_model()
+            Chunk.invalidate_model()
+        self._trigger_runners()
+        return job
+
+    @api.model
+    def _trigger_runners(self):
+        for xmlid in JOB_RUNNER_CRONS:
+            cron = self.env.ref(xmlid, raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+
+    # =======
+    # Actions
+    # =======
+
+    def action_retry_failed(self):
+        # Les morceaux sont écrits en sudo : on vérifie d'abord que l'utilisateur a accès aux tâches.
+        self.check_access_rights('read')
+        self.check_access_rule('read')
+        self.env['hostel.job.chunk'].sudo().search([('job_id', 'in', self.ids), ('state', '=', 'failed')]).write({
+            'state': 'pending',
+            'error': False,
+        })
+        self._trigger_runners()
+
+    # ======
+    # Runner
+    # ======
+
+    @api.model
+    def _cron_run_jobs(self, time_limit=JOB_RUNNER_TIME_LIMIT):
+        """
+        Exécute des morceaux en attente jusqu'à ce qu'il n'y en ait plus ou que 'time_limit' secondes soient écoulées.
+        Chaque morceau est validé (commit) séparément : un crash ne fait perdre que le morceau en cours.
+        """
+        Chunk = self.env['hostel.job.chunk']
+        deadline = time.monotonic() + time_limit
+        processed = 0
+        while time.monotonic() < deadline:
+            chunk = Chunk._acquire_next()
+            if not chunk:
+                break
+            try:
+                chunk._run()
+            except RETRYABLE_ERRORS:
+                # La transaction ne peut plus rien valider (REPEATABLE READ) : on l'annule et on rend la main,
+                # le morceau sera repris au prochain déclenchement du runner.
+                _logger.info("Hostel job runner: chunk %s hit a concurrent update, retried later", chunk.id)
+                self.env.cr.rollback()
+                self.env.invalidate_all(flush=False)
+                break
+            self.env.cr.commit()
+            self.env.invalidate_all()
+            processed += 1
+        if processed:
+            _logger.info("Hostel job runner: %s chunks processed", processed)
+        # Il reste du travail : on se redéclenche plutôt que d'attendre le prochain passage planifié.
+        if Chunk.search_count([('state', '=', 'pending')], limit=1):
+            self._trigger_runners()
+
+    # =====================
+    # Traitements standards
+    # =====================
+
+    @api.model
+    def _run_recompute_chunk(self, ids, model_name, field_names):
+        """
+        Recalcule des champs calculés stockés pour un morceau d'enregistrements.
+        """
+        records = self.env[model_name].browse(ids).exists()
+        for field_name in field_names:
+            self.env.add_to_compute(records._fields[field_name], records)
+        records.flush_recordset(field_names)
+        return {'records': len(records)}
+
+    @api.model
+    def _enqueue_recompute(self, model_name, field_names, domain=None, chunk_size=JOB_CHUNK_SIZE):
+        ids = self.env[model_name].search(domain or []).ids
+        return self._enqueue(
+            f"Recompute {', '.join(field_names)} on {model_name}", 'hostel.job', '_run_recompute_chunk', ids,
+            chunk_size=chunk_size, kwargs={'model_name': model_name, 'field_names': field_names},
+        )
+
+
+class HostelJobChunk(models.Model):
+    _name = 'hostel.job.chunk'
+    _description = "Chunk of a hostel background job."
+    _order = 'job_id, sequence'
+
+    job_id = fields.Many2one(string="Job", comodel_name='hostel.job', required=True, ondelete='cascade', index=True)
+    sequence = fields.Integer(string="Sequence", readonly=True)
+    payload = fields.Json(string="Payload", readonly=True)
+    state = fields.Selection(
+        selection=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')],
+        string="Status",
+        default='pending',
+        required=True,
+        readonly=True,
+    )
+    result = fields.Json(string="Result", readonly=True)
+    error = fields.Text(string="Error", readonly=True)
+    duration = fields.Float(string="Duration (s)", readonly=True)
+    date_done = fields.Datetime(string="Done On", readonly=True)
+
+    # =======================
+    # Index de base de donnée
+    # =======================
+
+    def init(self):
+        # Index partiel des morceaux en attente, dans l'ordre où le runner les prend.
+        create_index(
+            self.env.cr,
+            indexname='hostel_job_chunk_pending_index',
+            tablename=self._table,
+            expressions=['job_id', 'sequence'],
+            where="state = 'pending'",
+        )
+
+    # =========
+    # Exécution
+    # =========
+
+    @api.model
+    def _acquire_next(self):
+        """
+        Verrouille et retourne le prochain morceau en attente (plus ancienne tâche d'abord).
+        Les morceaux déjà pris par d'autres workers sont sautés (SKIP LOCKED) au lieu d'être attendus.
+        """
+        self.env.cr.execute("""
+            SELECT id FROM hostel_job_chunk
+             WHERE state = 'pending'
+             ORDER BY job_id, sequence
+             LIMIT 1
+               FOR NO KEY UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
+
+    def _run(self):
+        self.ensure_one()
+        job = self.job_id
+        if (job.model_name, job.method_name) not in JOB_HANDLERS:
+            # Ne pas lever d'erreur ici : le morceau resterait 'pending' et bloquerait le runner à chaque passage.
+            _logger.error("Hostel job %s: unsupported handler %s.%s", job.name, job.model_name, job.method_name)
+            self.write({'state': 'failed', 'error': f"Unsupported job handler: {job.model_name}.{job.method_name}"})
+            return
+        # Le traitement s'exécute avec les droits de l'utilisateur qui a créé la tâche ; l'état du morceau est écrit par le runner.
+        method = getattr(self.env[job.model_name].with_user(job.user_id), job.method_name)
+        start = time.perf_counter()
+        try:
+            with self.env.cr.savepoint():
+                result = method(self.payload, **(job.kwargs or {}))
+                self.env.flush_all()
+        except Exception as error:
+            self.env.invalidate_all(flush=False)
+            if isinstance(error, RETRYABLE_ERRORS):
+                raise
+            _logger.warning("Hostel job %s: chunk %s failed", job.name, self.sequence, exc_info=True)
+            self.write({'state': 'failed', 'error': str(error), 'duration': time.perf_counter() - start})
+            return
+        self.write({
+            'state': 'done',
+            'result': result if isinstance(result, (dict, list)) else None,
+            'duration': time.perf_counter() - start,
+            'date_done': fields.Datetime.now(),
+        })
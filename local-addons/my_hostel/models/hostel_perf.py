@@ -0,0 +1,163 @@
+import functools
+import logging
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import create_index
+
+_logger = logging.getLogger(__name__)
+
+# Clé des statistiques de la transaction en cours dans cr.precommit.data
+PROFILING_DATA_KEY = 'hostel.perf.stats'
+
+# Nombre de méthodes les plus coûteuses écrites dans le log
+PROFILING_LOG_TOP = 10
+
+# Durée de conservation par défaut (en jours) des échantillons (paramètre système 'my_hostel.profiling_retention_days')
+PROFILING_DEFAULT_RETENTION_DAYS = 7
+
+
+def hostel_profiled(kind):
+    """
+    Décorateur d'instrumentation des méthodes des modèles hostel ('compute', 'constraint' ou 'call').
+
+    Le profilage est activé :
+    - pour une requête, par la clé de contexte 'hostel_profile' (ex. with_context(hostel_profile=True)),
+    - pour toute l'instance, par le paramètre système 'my_hostel.profiling' (valeur non vide).
+
+    Désactivé, le décorateur ne coûte qu'une lecture de contexte et une lecture de paramètre système (en cache) par appel.
+    Activé, il mesure pour chaque appel le temps passé et le nombre de requêtes SQL exécutées (appels imbriqués inclus),
+    cumulés par méthode sur la transaction puis enregistrés en fin de transaction (cf. hostel.perf.sample).
+
+    Il se place sous les décorateurs de l'API (@api.depends, @api.constrains, @api.model_create_multi...) :
+
+        @api.depends('name')
+        @hostel_profiled('compute')
+        def _compute_display_name(self):
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not (self.env.context.get('hostel_profile') or self.env['hostel.perf.sample']._get_profiling_parameter()):
+                return method(self, *args, **kwargs)
+
+            cr = self.env.cr
+            queries_before = cr.sql_log_count
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                stats = self.env['hostel.perf.sample']._get_transaction_stats()
+                entry = stats.setdefault((self._name, method.__name__, kind), [0, 0, 0.0, 0])
+                entry[0] += 1
+                entry[1] += len(self)
+                entry[2] += time.perf_counter() - start
+                entry[3] += cr.sql_log_count - queries_before
+        return wrapper
+    return decorator
+
+
+class HostelPerfSample(models.Model):
+    _name = 'hostel.perf.sample'
+    _description = "Profiling sample of a method of the hostel models."
+    _order = 'duration desc'
+
+    """
+Échantillons de profilage : une ligne par méthode instrumentée et par transaction (cf. décorateur hostel_profiled).
+La vue liste permet de trier par durée ou par nombre de requêtes, la vue pivot de cumuler par méthode.
+
+Avec le profilage actif, chaque transaction ajoute des lignes : l'action planifiée _cron_cleanup_samples() supprime chaque nuit
+les échantillons de plus de 'my_hostel.profiling_retention_days' jours (7 par défaut).
+    """
+
+    model_name = fields.Char(string="Model", readonly=True, index=True)
+    method_name = fields.Char(string="Method", readonly=True, index=True)
+    kind = fields.Selection(
+        selection=[('compute', 'Compute'), ('constraint', 'Constraint'), ('call', 'Call')],
+        string="Kind",
+        readonly=True,
+    )
+    calls = fields.Integer(string="Calls", readonly=True)
+    record_count = fields.Integer(string="Records", readonly=True, help="Number of records processed by all the calls")
+    duration = fields.Float(string="Duration (ms)", readonly=True)
+    query_count = fields.Integer(string="SQL Queries", readonly=True)
+
+    def init(self):
+        # Suppression des anciens échantillons par date de création (cf. _cron_cleanup_samples()).
+        create_index(
+            self.env.cr,
+            indexname='hostel_perf_sample_create_date_index',
+            tablename=self._table,
+            expressions=['create_date'],
+        )
+
+    # ==========
+    # Activation
+    # ==========
+
+    @api.model
+    def _get_profiling_parameter(self):
+        # get_param est mis en cache par l'ORM (ormcache) : pas de requête SQL à chaque appel.
+        return self.env['ir.config_parameter'].sudo().get_param('my_hostel.profiling')
+
+    # ==========================
+    # Collecte et enregistrement
+    # ==========================
+
+    @api.model
+    def _get_transaction_stats(self):
+        """
+        Retourne le dictionnaire des statistiques de la transaction en cours :
+        {(modèle, méthode, type): [appels, enregistrements, secondes, requêtes]}.
+        Au premier appel, programme leur enregistrement en fin de transaction.
+        """
+        precommit = self.env.cr.precommit
+        if PROFILING_DATA_KEY not in precommit.data:
+            precommit.add(self.sudo()._flush_transaction_stats)
+        return precommit.data.setdefault(PROFILING_DATA_KEY, {})
+
+    @api.model
+    def _flush_transaction_stats(self):
+        stats = self.env.cr.precommit.data.pop(PROFILING_DATA_KEY, {})
+        if not stats:
+            return
+        hottest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+        _logger.info(
+            "Hostel profiling, hottest methods: %s",
+            ", ".join(
+                f"{model_name}.{method_name} ({calls} calls, {records} records, {seconds * 1000:.1f} ms, {queries} queries)"
+                for (model_name, method_name, _kind), (calls, records, seconds, queries) in hottest[:PROFILING_LOG_TOP]
+            ),
+        )
+        # Le contexte de profilage est retiré : les create() ci-dessous ne doivent pas être eux-mêmes profilés.
+        self.with_context(hostel_profile=False).create([{
+            'model_name': model_name,
+            'method_name': method_name,
+            'kind': kind,
+            'calls': calls,
+            'record_count': records,
+            'duration': seconds * 1000,
+            'query_count': queries,
+        } for (model_name, method_name, kind), (calls, records, seconds, queries) in hottest])
+        self.flush_model()
+
+    # =========
+    # Rétention
+    # =========
+
+    @api.model
+    def _cron_cleanup_samples(self):
+        """
+        Supprime en une requête les échantillons plus anciens que la durée de conservation. Retourne le nombre de lignes supprimées.
+        """
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'my_hostel.profiling_retention_days', PROFILING_DEFAULT_RETENTION_DAYS,
+        ))
+        cutoff = fields.Datetime.now() - timedelta(days=retention_days)
+        self.flush_model()
+        self.env.cr.execute(f"DELETE FROM {self._table} WHERE create_date < %s", [cutoff])
+        deleted = self.env.cr.rowcount
+        self.invalidate_model()
+        _logger.info("Hostel profiling: %s samples older than %s days deleted", deleted, retention_days)
+        return deleted
@@ -0,0 +1,24 @@
+from odoo import fields, models
+
+
+class HostelPostcode(models.Model):
+    _name = 'hostel.postcode'
+    _description = "Postcode centroid used to geolocate hostels without an external geocoder."
+    _order = 'country_id, zip'
+    _rec_name = 'zip'
+
+    """
+Table locale des centroïdes de codes postaux : (pays, code postal) -> (latitude, longitude).
+Elle est livrée avec le module (data/hostel.postcode.csv, quelques villes) et peut être complétée par l'import standard
+avec un fichier national complet. Elle sert à remplir la latitude et la longitude des hostels (cf. hostel.hostel._compute_geolocation()).
+    """
+
+    country_id = fields.Many2one(string="Country", comodel_name='res.country', required=True, ondelete='cascade')
+    zip = fields.Char(string="Zip", required=True)
+    name = fields.Char(string="City")
+    latitude = fields.Float(string="Latitude", digits=(10, 7), required=True)
+    longitude = fields.Float(string="Longitude", digits=(10, 7), required=True)
+
+    _sql_constraints = [
+        ('zip_country_unique', 'UNIQUE(zip, country_id)', "A postcode can only be defined once per country."),
+    ]
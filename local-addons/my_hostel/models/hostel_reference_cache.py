@@ -0,0 +1,216 @@
+import threading
+from collections import defaultdict
+
+from odoo import api, models
+from odoo.exceptions import AccessError
+from odoo.tools.lru import LRU
+
+# Nombre maximal d'entrées du cache, par base de données et par worker
+REFERENCE_CACHE_SIZE = 4096
+
+# Table d'une ligne qui porte la "version" des données de référence, partagée par tous les workers
+REFERENCE_CACHE_VERSION_TABLE = 'hostel_reference_cache_version'
+
+# Clé du verrou "consultatif" (pg_advisory_xact_lock) qui ordonne les écritures sur les données de référence et l'arbre des catégories
+REFERENCE_CACHE_LOCK_KEY = 0x686F7374656C
+
+# Clés des données de la transaction en cours dans cr.postcommit.data (vidées au commit et au rollback)
+REFERENCE_CACHE_VERSION_KEY = 'hostel.reference_cache.version'
+REFERENCE_CACHE_DIRTY_KEY = 'hostel.reference_cache.dirty'
+
+# Caches et compteurs du worker, par base de données : {dbname: [version, LRU]} et {dbname: {type: [succès, échecs]}}
+_caches = {}
+_stats = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+_lock = threading.RLock()
+
+
+class HostelReferenceCache(models.AbstractModel):
+    _name = 'hostel.reference.cache'
+    _description = "Per-worker cache of the hostel reference data."
+
+    """
+Cache en mémoire, dans chaque worker, des données de référence relues par tous les écrans des chambres et des étudiants :
+nom affiché et type des hostels, arbre des catégories, équipements actifs.
+Ces données sont petites et changent rarement.
+
+- Le cache est un LRU borné (REFERENCE_CACHE_SIZE entrées par base) : les entrées les moins utilisées sont évincées.
+- Invalidation entre workers : un numéro de version, dans la table d'une ligne REFERENCE_CACHE_VERSION_TABLE.
+  create/write/unlink sur hostel.hostel, hostel.category et hostel.amenities l'incrémentent dans leur transaction.
+  Chaque transaction lit la version une seule fois, à son premier accès au cache, et vide le cache du worker si elle a changé.
+- La version est une ligne de table et pas une séquence : une séquence n'est pas transactionnelle, une transaction dont la photo
+  de la base est antérieure au commit d'une modification pourrait lire la nouvelle version et mettre en cache les anciennes données.
+  Avec une ligne, la version lue correspond toujours aux données visibles par la transaction.
+- Dans la transaction qui modifie ces données, le cache est ignoré jusqu'à la fin : elle voit toujours ses propres modifications,
+  et rien de ce qu'elle lit n'est mis en cache avant son commit.
+- Des compteurs succès/échecs par type de donnée permettent de vérifier l'efficacité du cache (cf. get_stats()).
+
+Les lectures passent par des requêtes SQL, sans droits d'accès : les méthodes d'accès aux données sont privées et ne servent
+qu'aux calculs de 'display_name' (hostels, catégories, équipements) et au wizard d'affectation. Seuls les managers lisent les compteurs.
+
+Exemple :
+
+    env['hostel.reference.cache']._get_hostel_info([1, 2])  --> {1: ('Hostel A (HA)', 'male'), 2: ('Hostel B (HB)', 'common')}
+    env['hostel.reference.cache'].get_stats()               --> {'hostel': {'hits': 1520, 'misses': 12, 'ratio': 0.992}, ...}
+    """
+
+    def init(self):
+        self.env.cr.execute(f"""
+            CREATE TABLE IF NOT EXISTS {REFERENCE_CACHE_VERSION_TABLE} (id integer PRIMARY KEY, version bigint NOT NULL);
+            INSERT INTO {REFERENCE_CACHE_VERSION_TABLE} (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+        """)
+
+    # =========
+    # Mécanique
+    # =========
+
+    @api.model
+    def _get_lru(self):
+        """
+        Retourne le LRU du worker pour la base courante, vidé si la version a changé depuis le dernier accès.
+        La version n'est lue qu'une fois par transaction. Retourne None si la transaction voit une version plus ancienne
+        que celle du cache (sa photo de la base est antérieure) : elle ne doit alors ni lire ni remplir le cache.
+        """
+        data = self.env.cr.postcommit.data
+        if REFERENCE_CACHE_VERSION_KEY not in data:
+            self.env.cr.execute(f"SELECT version FROM {REFERENCE_CACHE_VERSION_TABLE} WHERE id = 1")
+            data[REFERENCE_CACHE_VERSION_KEY] = self.env.cr.fetchone()[0]
+        version = data[REFERENCE_CACHE_VERSION_KEY]
+        dbname = self.env.cr.dbname
+        with _lock:
+            cache = _caches.get(dbname)
+            if cache is None or cache[0] < version:
+                cache = _caches[dbname] = [version, LRU(REFERENCE_CACHE_SIZE)]
+            return cache[1] if cache[0] == version else None
+
+    @api.model
+    def _lookup(self, kind, keys, loader):
+        """
+        Retourne {clé: valeur} pour les clés demandées. Les clés absentes du cache sont chargées en un seul appel
+        à loader(clés manquantes), qui retourne un dictionnaire {clé: valeur}.
+        """
+        lru = None if self.env.cr.postcommit.data.get(REFERENCE_CACHE_DIRTY_KEY) else self._get_lru()
+        if lru is None:
+            return loader(list(keys)) if keys else {}
+        result, missing = {}, []
+        for key in keys:
+            try:
+                result[key] = lru[(kind, key)]
+            except KeyError:
+                missing.append(key)
+        stats = _stats[self.env.cr.dbname][kind]
+        with _lock:
+            stats[0] += len(result)
+            stats[1] += len(missing)
+        if missing:
+            loaded = loader(missing)
+            for key, value in loaded.items():
+                lru[(kind, key)] = value
+            result.update(loaded)
+        return result
+
+    @api.model
+    def _invalidate(self):
+        """
+        À appeler quand une donnée de référence change, AVANT de la modifier : la version est incrémentée (une fois par transaction)
+        et le cache est ignoré pour le reste de la transaction. Au commit, tous les workers voient la nouvelle version.
+
+        Attention, toutes les écritures sur les hostels, catégories et équipements passent par cette même ligne :
+        - elle reste verrouillée jusqu'à la fin de la transaction : ces écritures sont sérialisées entre tous les workers ;
+        - Odoo travaille en REPEATABLE READ : la seconde transaction n'attend pas seulement, elle échoue avec une erreur
+          de sérialisation quand la première valide. Odoo rejoue alors la requête HTTP ; une action planifiée réessaiera à son
+          prochain passage. Les données de référence changent rarement, c'est acceptable ; il ne faut pas appeler _invalidate()
+          pour des champs qui ne sont pas dans le cache.
+
+        Ordre des verrous (pas de deadlock) : le verrou exclusif REFERENCE_CACHE_LOCK_KEY est pris avant la ligne de version,
+        et avant toute ligne de hostel_category. Les mises à jour des cumuls des catégories prennent ce même verrou
+        en mode partagé (cf. _lock_reference_data()) avant de verrouiller leurs lignes.
+        """
+        data = self.env.cr.postcommit.data
+        if data.get(REFERENCE_CACHE_DIRTY_KEY):
+            return
+        data[REFERENCE_CACHE_DIRTY_KEY] = True
+        self._lock_reference_data()
+        self.env.cr.execute(f"UPDATE {REFERENCE_CACHE_VERSION_TABLE} SET version = version + 1 WHERE id = 1")
+
+    @api.model
+    def _lock_reference_data(self, shared=False):
+        """
+        Prend le verrou des données de référence jusqu'à la fin de la transaction : exclusif pour les modifications
+        (_invalidate(), hostel.category.move_subtree()), partagé pour les mises à jour des cumuls des catégories.
+        Un verrou consultatif, et pas un SELECT ... FOR SHARE sur la ligne de version : il ne provoque pas d'erreur de sérialisation
+        dans les tâches de fond dont la photo de la base est antérieure à la dernière modification.
+        """
+        function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+        self.env.cr.execute(f"SELECT {function}(%s)", [REFERENCE_CACHE_LOCK_KEY])
+
+    # =================
+    # Accès aux données
+    # =================
+
+    @api.model
+    def _get_hostel_info(self, hostel_ids):
+        """
+        Retourne {hostel_id: (nom affiché, type)} pour les hostels demandés.
+        """
+        def load(ids):
+            self.env['hostel.hostel'].flush_model(['name', 'hostel_code', 'type'])
+            self.env.cr.execute("SELECT id, name, hostel_code, type FROM hostel_hostel WHERE id IN %s", [tuple(ids)])
+            Hostel = self.env['hostel.hostel']
+            return {
+                hostel_id: (Hostel._format_display_name(name, code), hostel_type)
+                for hostel_id, name, code, hostel_type in self.env.cr.fetchall()
+            }
+        return self._lookup('hostel', hostel_ids, load)
+
+    @api.model
+    def _get_category_tree(self):
+        """
+        Retourne l'arbre des catégories : un tuple de (id, nom, parent_id, parent_path), trié par parent_path.
+        """
+        def load(keys):
+            self.env['hostel.category'].flush_model(['name', 'parent_id', 'parent_path'])
+            self.env.cr.execute("SELECT id, name, parent_id, parent_path FROM hostel_category ORDER BY parent_path")
+            return {keys[0]: tuple(self.env.cr.fetchall())}
+        return self._lookup('category_tree', ['all'], load)['all']
+
+    @api.model
+    def _get_active_amenities(self):
+        """
+        Retourne les équipements actifs : un tuple de (id, nom), trié par nom.
+        """
+        def load(keys):
+            self.env['hostel.amenities'].flush_model(['name', 'active'])
+            self.env.cr.execute("SELECT id, name FROM hostel_amenities WHERE active ORDER BY name, id")
+            return {keys[0]: tuple(self.env.cr.fetchall())}
+        return self._lookup('amenities', ['active'], load)['active']
+
+    # =========
+    # Compteurs
+    # =========
+
+    @api.model
+    def _check_manager(self):
+        if not self.env.user.has_group('my_hostel.group_hostel_manager'):
+            raise AccessError("Error. Only hostel managers can access the reference cache statistics.")
+
+    @api.model
+    def get_stats(self):
+        """
+        Retourne les compteurs du worker pour la base courante : {type: {'hits', 'misses', 'ratio'}}, et la taille du cache.
+        """
+        self._check_manager()
+        dbname = self.env.cr.dbname
+        with _lock:
+            stats = {
+                kind: {'hits': hits, 'misses': misses, 'ratio': round(hits / (hits + misses), 3) if hits + misses else 0.0}
+                for kind, (hits, misses) in _stats[dbname].items()
+            }
+            cache = _caches.get(dbname)
+            stats['size'] = len(cache[1]) if cache else 0
+        return stats
+
+    @api.model
+    def reset_stats(self):
+        self._check_manager()
+        with _lock:
+            _stats.pop(self.env.cr.dbname, None)
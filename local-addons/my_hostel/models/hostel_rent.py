@@ -0,0 +1,273 @@
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.exceptions import ValidationError
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Nombre de chambres facturées par requête INSERT
+RENT_BATCH_SIZE = 2000
+
+
+class HostelRentRun(models.Model):
+    _name = 'hostel.rent.run'
+    _description = "Rent run: monthly rent charges of all the occupants for a billing period."
+    _order = 'date_from desc'
+
+    """
+Génération des loyers : une ligne de charge par occupant, par chambre et par période de facturation.
+
+Le loyer d'une chambre (rent_amount, mensuel) est réparti jour par jour entre les occupants présents ce jour-là :
+
+    montant = loyer de la chambre * somme, sur les jours de présence, de 1 / (jours du mois de ce jour * occupants présents ce jour)
+
+Le loyer journalier dépend du mois de chaque jour (loyer / 28, 29, 30 ou 31) et non de la longueur de la période :
+une période sur plusieurs mois, ou sur une partie d'un mois, est facturée au même tarif que les mois complets qu'elle recouvre.
+
+Les séjours sont lus dans hostel.student (depuis l'arrivée dans la chambre actuelle, 'room_date') et dans hostel.stay.history
+(départs archivés et changements de chambre) : un étudiant qui a changé de chambre pendant la période a une ligne par chambre,
+et ses colocataires ne partagent le loyer avec lui que pour les jours où il était dans leur chambre.
+
+Le calcul est fait en SQL, par paquets de RENT_BATCH_SIZE chambres (un INSERT ... SELECT par paquet, generate_series sur les jours),
+sans charger les enregistrements dans l'ORM. Le taux de change vers la devise de la société est lu une seule fois par devise,
+au début du calcul.
+
+La génération est idempotente : une ligne est unique par (période, étudiant, chambre) et les lignes déjà créées sont ignorées
+(ON CONFLICT DO NOTHING). Relancer un calcul interrompu reprend donc là où il s'était arrêté, sans doublon.
+Depuis l'action planifiée, chaque paquet est validé (commit) : 50 000 étudiants tiennent dans un seul passage du cron.
+    """
+
+    name = fields.Char(string="Name", compute='_compute_name', store=True)
+    date_from = fields.Date(string="Period Start", required=True)
+    date_to = fields.Date(string="Period End", required=True)
+    state = fields.Selection(
+        selection=[('draft', 'Draft'), ('done', 'Done')],
+        string="Status",
+        default='draft',
+        readonly=True,
+    )
+    company_id = fields.Many2one(
+        string="Company",
+        comodel_name='res.company',
+        required=True,
+        default=lambda self: self.env.company,
+    )
+    currency_id = fields.Many2one(string="Currency", related='company_id.currency_id')
+    line_ids = fields.One2many(string="Charges", comodel_name='hostel.rent.line', inverse_name='run_id', readonly=True)
+    line_count = fields.Integer(string="Charge Count", compute='_compute_totals')
+    amount_total = fields.Monetary(string="Total", compute='_compute_totals', currency_field='currency_id')
+
+    _sql_constraints = [
+        ('period_unique', 'UNIQUE(company_id, date_from, date_to)', "A rent run already exists for this period."),
+    ]
+
+    # ===========
+    # Contraintes
+    # ===========
+
+    @api.constrains('date_from', 'date_to')
+    def _check_period(self):
+        for run in self:
+            if run.date_from > run.date_to:
+                raise ValidationError("The period start must be before the period end.")
+
+    # =======
+    # Compute
+    # =======
+
+    @api.depends('date_from', 'date_to')
+    def _compute_name(self):
+        for run in self:
+            run.name = f"Rent {run.date_from} - {run.date_to}" if run.date_from and run.date_to else False
+
+    def _compute_totals(self):
+        # Une seule requête d'agrégat pour tous les calculs affichés, sans lire les lignes.
+        totals = {
+            run.id: (count, amount)
+            for run, count, amount in self.env['hostel.rent.line']._read_group(
+                [('run_id', 'in', self.ids)], ['run_id'], ['__count', 'amount_company:sum'],
+            )
+        }
+        for run in self:
+            run.line_count, run.amount_total = totals.get(run.id, (0, 0.0))
+
+    # =======
+    # Actions
+    # =======
+
+    def action_generate_charges(self):
+        for run in self:
+            run._generate_charges()
+
+    @api.model
+    def _cron_generate_monthly_rent(self):
+        """
+        Action planifiée : génère les loyers du mois précédent (période close) pour la société courante.
+        """
+        today = fields.Date.context_today(self)
+        date_to = today.replace(day=1) - timedelta(days=1)
+        date_from = date_to.replace(day=1)
+        run = self.search([
+            ('company_id', '=', self.env.company.id), ('date_from', '=', date_from), ('date_to', '=', date_to),
+        ])
+        if not run:
+            run = self.create({'date_from': date_from, 'date_to': date_to})
+            self.env.cr.commit()
+        if run.state == 'draft':
+            run._generate_charges(auto_commit=True)
+
+    # =====================
+    # Moteur de facturation
+    # =====================
+
+    def _get_currency_rates(self):
+        """
+        Retourne {currency_id: (taux vers la devise de la société, nombre de décimales)} pour les devises des chambres :
+        une seule recherche de taux par devise.
+        """
+        self.ensure_one()
+        company_currency = self.company_id.currency_id
+        self.env.cr.execute("SELECT DISTINCT currency_id FROM hostel_room WHERE currency_id IS NOT NULL")
+        currencies = self.env['res.currency'].browse([row[0] for row in self.env.cr.fetchall()]) | company_currency
+        return {
+            currency.id: (
+                currency._get_conversion_rate(currency, company_currency, self.company_id, self.date_to),
+                currency.decimal_places,
+            )
+            for currency in currencies
+        }
+
+    # Séjours dans les chambres, bornés à la période : étudiants actuels (depuis leur arrivée dans la chambre, 'room_date')
+    # et séjours de l'historique (départs archivés, anciennes chambres des étudiants qui ont changé de chambre).
+    # Les séjours hors de la période ont une date de début postérieure à leur date de fin.
+    _ROOM_STAYS_QUERY = """
+        SELECT s.id AS student_id, s.room_id,
+               GREATEST(s.admission_date, s.room_date, %(date_from)s::date) AS start_date,
+               LEAST(s.discharge_date, %(date_to)s::date) AS end_date
+          FROM hostel_student s
+         WHERE s.room_id IS NOT NULL
+         UNION ALL
+        SELECT h.student_ref, h.room_id,
+               GREATEST(h.admission_date, h.room_date, %(date_from)s::date),
+               LEAST(h.discharge_date, %(date_to)s::date)
+          FROM hostel_stay_history h
+         WHERE h.room_id IS NOT NULL
+    """
+
+    def _generate_charges(self, batch_size=RENT_BATCH_SIZE, auto_commit=False):
+        self.ensure_one()
+        self.env['hostel.student'].flush_model(['room_id', 'admission_date', 'room_date', 'discharge_date'])
+        self.env['hostel.stay.history'].flush_model(['student_ref', 'room_id', 'admission_date', 'room_date', 'discharge_date'])
+        self.env['hostel.room'].flush_model(['hostel_id', 'rent_amount', 'currency_id'])
+        self.flush_recordset()
+
+        company_currency = self.company_id.currency_id
+        rates = self._get_currency_rates()
+        rate_values = ", ".join(
+            f"(%(currency_{index})s::int, %(rate_{index})s::numeric, %(digits_{index})s::int)" for index in range(len(rates))
+        )
+        params = {
+            'run_id': self.id,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'company_currency_id': company_currency.id,
+            'company_digits': company_currency.decimal_places,
+            'uid': self.env.uid,
+        }
+        for index, (currency_id, (rate, digits)) in enumerate(rates.items()):
+            params.update({f'currency_{index}': currency_id, f'rate_{index}': rate, f'digits_{index}': digits})
+
+        # Chambres à facturer : celles où un étudiant encore présent dans hostel.student a séjourné pendant la période.
+        self.env.cr.execute(f"""
+            SELECT DISTINCT stays.room_id
+              FROM ({self._ROOM_STAYS_QUERY}) stays
+              JOIN hostel_student s ON s.id = stays.student_id
+             WHERE stays.start_date <= stays.end_date
+             ORDER BY stays.room_id
+        """, params)
+        room_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        created = 0
+        for batch_room_ids in split_every(batch_size, room_ids, list):
+            # Une ligne par jour de présence de chaque séjour, puis le nombre d'occupants de la chambre ce jour-là :
+            # chaque étudiant paie, pour chaque jour, le loyer journalier (loyer / jours du mois) divisé par les occupants présents ce jour.
+            query = f"""
+                WITH rates(currency_id, rate, digits) AS (VALUES {rate_values}),
+                stays AS (
+                    SELECT *
+                      FROM ({self._ROOM_STAYS_QUERY}) stays
+                     WHERE stays.start_date <= stays.end_date
+                       AND stays.room_id = ANY(%(room_ids)s)
+                ),
+                presence AS (
+                    SELECT stays.student_id, stays.room_id, day::date AS day,
+                           EXTRACT(DAY FROM date_trunc('month', day) + interval '1 month - 1 day') AS month_days
+                      FROM stays, generate_series(stays.start_date, stays.end_date, interval '1 day') AS day
+                ),
+                occupancy AS (
+                    SELECT room_id, day, COUNT(*) AS occupants
+                      FROM presence
+                  GROUP BY room_id, day
+                ),
+                charges AS (
+                    SELECT p.student_id, p.room_id, r.hostel_id,
+                           COALESCE(r.currency_id, %(company_currency_id)s) AS currency_id,
+                           COUNT(*) AS days,
+                           MAX(o.occupants) AS occupant_count,
+                           COALESCE(r.rent_amount, 0) * SUM(1.0 / (p.month_days * o.occupants)) AS amount
+                      FROM presence p
+                      JOIN occupancy o ON o.room_id = p.room_id AND o.day = p.day
+                      JOIN hostel_student s ON s.id = p.student_id
+                      JOIN hostel_room r ON r.id = p.room_id
+                  GROUP BY p.student_id, p.room_id, r.hostel_id, r.currency_id, r.rent_amount
+                )
+                INSERT INTO hostel_rent_line (
+                    run_id, student_id, room_id, hostel_id, days, occupant_count,
+                    currency_id, amount, company_currency_id, amount_company,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT %(run_id)s, student_id, room_id, hostel_id, days, occupant_count,
+                       charges.currency_id, ROUND(amount, digits), %(company_currency_id)s, ROUND(amount * rate, %(company_digits)s),
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM charges
+                  JOIN rates ON rates.currency_id = charges.currency_id
+                ON CONFLICT (run_id, student_id, room_id) DO NOTHING
+            """
+            self.env.cr.execute(query, dict(params, room_ids=batch_room_ids))
+            created += self.env.cr.rowcount
+            if auto_commit:
+                self.env.cr.commit()
+
+        self.env['hostel.rent.line'].invalidate_model()
+        self.state = 'done'
+        _logger.info("Rent run %s: %s charges created", self.name, created)
+        return created
+
+
+class HostelRentLine(models.Model):
+    _name = 'hostel.rent.line'
+    _description = "Rent charge of a student for a billing period."
+    _order = 'run_id desc, hostel_id, room_id, student_id'
+
+    """
+Ligne de loyer : créée uniquement par le moteur de facturation (cf. hostel.rent.run._generate_charges()).
+    """
+
+    run_id = fields.Many2one(string="Rent Run", comodel_name='hostel.rent.run', required=True, ondelete='cascade', index=True)
+    student_id = fields.Many2one(string="Student", comodel_name='hostel.student', ondelete='set null', index=True)
+    # Rempli à l'archivage de l'étudiant (cf. hostel.stay.history), qui vide 'student_id'.
+    stay_history_id = fields.Many2one(string="Archived Stay", comodel_name='hostel.stay.history', ondelete='set null', index=True)
+    room_id = fields.Many2one(string="Room", comodel_name='hostel.room', ondelete='set null')
+    hostel_id = fields.Many2one(string="Hostel", comodel_name='hostel.hostel', ondelete='set null', index=True)
+    days = fields.Integer(string="Days", help="Days of presence in the period")
+    occupant_count = fields.Integer(string="Occupants", help="Maximum number of occupants sharing the room on a day of the stay")
+    currency_id = fields.Many2one(string="Currency", comodel_name='res.currency')
+    amount = fields.Monetary(string="Amount", currency_field='currency_id')
+    company_currency_id = fields.Many2one(string="Company Currency", comodel_name='res.currency')
+    amount_company = fields.Monetary(string="Amount (Company Currency)", currency_field='company_currency_id')
+
+    _sql_constraints = [
+        ('student_run_unique', 'UNIQUE(run_id, student_id, room_id)', "A student can only be charged once per room and rent run."),
+    ]
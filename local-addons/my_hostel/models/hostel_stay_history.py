@@ -0,0 +1,191 @@
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import create_index
+
+_logger = logging.getLogger(__name__)
+
+# Nombre d'étudiants archivés par paquet
+ARCHIVE_BATCH_SIZE = 10000
+
+# Délai par défaut (en jours) entre la date de départ d'un étudiant et son archivage (paramètre système 'my_hostel.stay_archive_delay')
+ARCHIVE_DEFAULT_DELAY = 60
+
+
+class HostelStayHistory(models.Model):
+    _name = 'hostel.stay.history'
+    _description = "History of the past stays of the students."
+    _order = 'discharge_date desc, id desc'
+
+    """
+Historique des séjours terminés.
+
+hostel.student gardait tous les étudiants depuis toujours, avec leur chambre : les occupants d'une chambre (student_ids),
+sa disponibilité et toutes les lectures d'occupation parcouraient des années d'anciens résidents.
+
+L'action planifiée _cron_archive_discharged_stays() déplace par paquets les étudiants partis depuis plus de
+'my_hostel.stay_archive_delay' jours (60 par défaut) dans cette table, puis les supprime de hostel.student :
+la table des étudiants ne contient plus que les résidents actuels (et les départs récents).
+
+Pendant ce délai, un étudiant parti garde sa chambre ('room_id', utile à la facturation) mais n'occupe plus de lit :
+l'occupation des chambres ('occupied_beds', 'availability') et le contrôle de capacité ne comptent que les occupants actuels,
+et l'action planifiée hostel.room._cron_release_discharged_beds() libère chaque nuit les lits des départs de la veille.
+
+- La copie est faite en une requête INSERT ... SELECT par paquet.
+- La suppression passe par l'ORM (unlink) : les cumuls des chambres, des hostels et des catégories restent à jour.
+- Les lignes de loyer des étudiants archivés sont rattachées à leur séjour archivé (stay_history_id).
+  Le délai doit donc couvrir la dernière période de loyers facturée (cf. hostel.rent.run), d'où les 60 jours par défaut.
+- Le moteur d'occupation (cf. hostel.room.get_peak_occupancy()) lit aussi l'historique : les rapports sur le passé restent justes.
+
+Les changements de chambre y sont aussi enregistrés (reason = 'move', cf. _record_room_moves()) : le séjour dans l'ancienne chambre
+se termine la veille du changement. Le moteur d'occupation et la facturation des loyers (cf. hostel.rent.run) comptent ainsi chaque
+étudiant dans la bonne chambre pour chaque jour d'une période, même s'il a déménagé au milieu.
+    """
+
+    student_ref = fields.Integer(string="Student ID", readonly=True, index=True, help="ID of the archived hostel.student record")
+    student_firstname = fields.Char(string="Firstname", readonly=True)
+    student_lastname = fields.Char(string="Lastname", readonly=True)
+    gender = fields.Selection(
+        selection=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')],
+        string="Gender",
+        readonly=True,
+    )
+    room_id = fields.Many2one(string="Room", comodel_name='hostel.room', readonly=True, ondelete='set null')
+    hostel_id = fields.Many2one(string="Hostel", comodel_name='hostel.hostel', readonly=True, ondelete='set null')
+    admission_date = fields.Date(string="Admission Date", readonly=True)
+    room_date = fields.Date(string="In Room Since", readonly=True, help="Start of the stay in this room, if after the admission")
+    discharge_date = fields.Date(string="Discharge Date", readonly=True, help="Last day in the room")
+    reason = fields.Selection(
+        selection=[('discharge', 'Discharge'), ('move', 'Room Change')],
+        string="Reason",
+        default='discharge',
+        readonly=True,
+    )
+    duration = fields.Integer(string="Duration", readonly=True)
+    archive_date = fields.Date(string="Archived On", readonly=True)
+
+    # =======================
+    # Index de base de donnée
+    # =======================
+
+    def init(self):
+        """
+        Rapports par hostel et par date : index (hostel_id, discharge_date).
+        Moteur d'occupation (séjours d'une chambre qui chevauchent une période) : index (room_id, admission_date, discharge_date).
+        """
+        create_index(
+            self.env.cr,
+            indexname='hostel_stay_history_hostel_date_index',
+            tablename=self._table,
+            expressions=['hostel_id', 'discharge_date'],
+        )
+        create_index(
+            self.env.cr,
+            indexname='hostel_stay_history_room_stay_index',
+            tablename=self._table,
+            expressions=['room_id', 'admission_date', 'discharge_date'],
+        )
+
+    # =========
+    # Archivage
+    # =========
+
+    @api.model
+    def _get_archive_cutoff(self):
+        delay = int(self.env['ir.config_parameter'].sudo().get_param('my_hostel.stay_archive_delay', ARCHIVE_DEFAULT_DELAY))
+        return fields.Date.context_today(self) - timedelta(days=delay)
+
+    @api.model
+    def _archive_discharged_stays(self, batch_size=ARCHIVE_BATCH_SIZE, auto_commit=False):
+        """
+        Archive les étudiants partis avant la date limite, par paquets de 'batch_size'. Retourne le nombre d'étudiants archivés.
+        """
+        Student = self.env['hostel.student']
+        cutoff = self._get_archive_cutoff()
+        archived = 0
+        while True:
+            Student.flush_model()
+            self.env.cr.execute(
+                "SELECT id FROM hostel_student WHERE discharge_date < %s LIMIT %s",
+                [cutoff, batch_size],
+            )
+            student_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not student_ids:
+                break
+
+            self.env.cr.execute("""
+                INSERT INTO hostel_stay_history (
+                    student_ref, student_firstname, student_lastname, gender, room_id, hostel_id,
+                    admission_date, room_date, discharge_date, duration, reason, archive_date,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT id, student_firstname, student_lastname, gender, room_id, hostel_id,
+                       admission_date, room_date, discharge_date, duration, 'discharge', %(today)s,
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM hostel_student
+                 WHERE id = ANY(%(student_ids)s)
+            """, {'student_ids': student_ids, 'today': fields.Date.context_today(self), 'uid': self.env.uid})
+            # Les loyers déjà facturés suivent le séjour archivé de la même chambre (leur lien vers l'étudiant sera vidé par la suppression).
+            self.env['hostel.rent.line'].flush_model()
+            self.env.cr.execute("""
+                UPDATE hostel_rent_line l
+                   SET stay_history_id = h.id
+                  FROM (
+                        SELECT DISTINCT ON (student_ref, room_id) id, student_ref, room_id
+                          FROM hostel_stay_history
+                         WHERE student_ref = ANY(%(student_ids)s)
+                      ORDER BY student_ref, room_id, id DESC
+                       ) h
+                 WHERE h.student_ref = l.student_id
+                   AND h.room_id IS NOT DISTINCT FROM l.room_id
+                   AND l.student_id = ANY(%(student_ids)s)
+            """, {'student_ids': student_ids})
+
+            Student.browse(student_ids).unlink()
+            self.env.flush_all()
+            self.env.invalidate_all()
+            archived += len(student_ids)
+            if auto_commit:
+                self.env.cr.commit()
+
+        _logger.info("Stay archival: %s students archived (discharged before %s)", archived, cutoff)
+        return archived
+
+    @api.model
+    def _cron_archive_discharged_stays(self):
+        self._archive_discharged_stays(auto_commit=True)
+
+    # ======================
+    # Changements de chambre
+    # ======================
+
+    @api.model
+    def _record_room_moves(self, students, move_date):
+        """
+        Enregistre, en une requête, le séjour des étudiants donnés dans leur chambre actuelle, avant qu'ils n'en changent le 'move_date'.
+        Le séjour se termine la veille (ou à la date de départ si elle est antérieure). Les séjours qui n'ont pas encore commencé
+        (admission ou arrivée dans la chambre à partir du 'move_date') ne sont pas enregistrés.
+        """
+        if not students:
+            return
+        students.flush_recordset(['room_id', 'hostel_id', 'admission_date', 'room_date', 'discharge_date'])
+        self.env.cr.execute("""
+            INSERT INTO hostel_stay_history (
+                student_ref, student_firstname, student_lastname, gender, room_id, hostel_id,
+                admission_date, room_date, discharge_date, duration, reason, archive_date,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT id, student_firstname, student_lastname, gender, room_id, hostel_id,
+                   admission_date, room_date, stay_end, stay_end - stay_start, 'move', %(move_date)s,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM (
+                    SELECT *,
+                           GREATEST(admission_date, room_date) AS stay_start,
+                           LEAST(discharge_date, %(move_date)s::date - 1) AS stay_end
+                      FROM hostel_student
+                     WHERE id = ANY(%(student_ids)s)
+                       AND room_id IS NOT NULL
+                   ) s
+             WHERE stay_start IS NULL OR stay_start <= stay_end
+        """, {'student_ids': students.ids, 'move_date': move_date, 'uid': self.env.uid})
@@ -1,9 +1,18 @@
 from odoo import api, fields, models
+from odoo.exceptions import ValidationError
+from odoo.tools import create_index
+from collections import defaultdict
 from datetime import timedelta
+from .hostel_perf import hostel_profiled
 
 class HostelStudent(models.Model):
     _name = 'hostel.student'
+    _inherit = ['hostel.trigram.search.mixin']
     _description = "Model used to represent students which locate rooms in hostels."
+    _rec_names_search = ['student_firstname', 'student_lastname']
+
+    # Autocomplétion : recherche floue sur "prénom nom" (cf. hostel.trigram.search.mixin).
+    _trigram_search_fields = ['student_firstname', 'student_lastname']
 
     # ===============
     # Champs basiques
@@ -37,6 +46,22 @@ class HostelStudent(models.Model):
         help="Select hostel room",
     )
 
+    # Préférences (optionnelles) utilisées par l'affectation automatique des chambres (cf. wizard hostel.room.assignment).
+    preferred_floor_no = fields.Integer(
+        string="Preferred Floor",
+        help="Floor the student would like to live on (0 = no preference)",
+    )
+
+    preferred_amenity_ids = fields.Many2many(
+        comodel_name='hostel.amenities',
+        relation="hostel_student_amenities_rel",
+        column1="student_id",
+        column2="amenity_id",
+        string="Required Amenities",
+        domain="[('active', '=', True)]",
+        help="Amenities the allocated room must provide",
+    )
+
     # ==============================================
     # Champs relatifs à l'hostel (ex. champ related)
     # ==============================================
@@ -98,10 +123,14 @@ Si on créer 100 sale.order.line d'un coup, cela représente 100 requêtes SQL.
 Le mieux dans ces cas là c'est de passer directement par le champ du modèle parent : if line.order_id.partner_id !
     """
 
+    # Le champ related est stocké et indexé : on peut filtrer, grouper et exporter les étudiants par hostel sans passer par hostel.room.
+    # Quand une chambre change d'hostel, la mise à jour est faite en une seule requête (cf. hostel.room.write()).
     hostel_id = fields.Many2one(
         string="Hostel",
         comodel_name='hostel.hostel',
         related='room_id.hostel_id',
+        store=True,
+        index=True,
     )
 
     # ========================================================================================
@@ -118,14 +147,177 @@ Le mieux dans ces cas là c'est de passer directement par le champ du modèle pa
         help="Date on which student discharge",
     )
 
+    # Date d'arrivée dans la chambre actuelle, écrite à chaque changement de chambre : le séjour dans l'ancienne chambre
+    # est enregistré dans l'historique (cf. hostel.stay.history._record_room_moves()). Vide = depuis l'admission.
+    room_date = fields.Date(
+        string="In Room Since",
+        help="Date on which the student moved into the current room (empty: since the admission)",
+    )
+
+    # 'duration' est stocké : on peut chercher, trier et faire des moyennes dessus (vues liste, pivot, read_group) sans charger les étudiants.
+    # Pour un séjour en cours (sans date de départ), la durée est celle écoulée depuis l'admission : elle est rafraîchie chaque nuit
+    # par l'action planifiée _cron_refresh_open_stay_duration().
     duration = fields.Integer(
         string="Duration",
         compute="_compute_check_duration",
         inverse="_inverse_duration",
+        store=True,
         help="Enter duration of living",
     )
 
 
+    # =======================
+    # Index de base de donnée
+    # =======================
+
+    def init(self):
+        """
+        Méthode appelée à l'installation / mise à jour du module, après la création des tables.
+
+        Le moteur d'occupation (cf. hostel.room.get_free_rooms) cherche les séjours d'une chambre qui chevauchent une période.
+        Un index composite (room_id, admission_date, discharge_date) permet à PostgreSQL de répondre à cette requête
+        sans parcourir tout l'historique des séjours.
+        """
+        super().init()
+        create_index(
+            self.env.cr,
+            indexname='hostel_student_room_stay_index',
+            tablename=self._table,
+            expressions=['room_id', 'admission_date', 'discharge_date'],
+        )
+        # Index partiel des séjours en cours, parcourus chaque nuit par _cron_refresh_open_stay_duration().
+        create_index(
+            self.env.cr,
+            indexname='hostel_student_open_stay_index',
+            tablename=self._table,
+            expressions=['admission_date'],
+            where='discharge_date IS NULL',
+        )
+        # Index partiel des séjours terminés, parcourus par l'archivage (cf. hostel.stay.history).
+        create_index(
+            self.env.cr,
+            indexname='hostel_student_discharge_index',
+            tablename=self._table,
+            expressions=['discharge_date'],
+            where='discharge_date IS NOT NULL',
+        )
+
+    # =========
+    # Overrides
+    # =========
+
+    """
+Changer la chambre d'un étudiant modifie le nombre de lits occupés de son hostel, donc ses cumuls et ceux de ses catégories :
+la contribution des chambres à leur hostel est mémorisée avant la modification (cf. hostel.hostel._apply_rollup_deltas()),
+les catégories suivent au prochain passage de l'action planifiée (cf. hostel.hostel._cron_refresh_rollups()).
+Le 'write_date' des chambres concernées est aussi mis à jour, pour les validateurs HTTP de l'API JSON (cf. controllers/main.py).
+    """
+
+    @api.model_create_multi
+    @hostel_profiled('call')
+    def create(self, vals_list):
+        Room = self.env['hostel.room']
+        self.env['hostel.hostel']._snapshot_room_contributions(
+            Room.browse({vals['room_id'] for vals in vals_list if vals.get('room_id')})
+        )
+        students = super().create(vals_list)
+        students.room_id._touch_occupancy()
+        return students
+
+    @hostel_profiled('call')
+    def write(self, vals):
+        # La date de départ change aussi l'occupation de la chambre (un étudiant parti n'occupe plus de lit).
+        occupancy_fields = {'room_id', 'discharge_date'}
+        old_rooms = self.room_id if occupancy_fields & vals.keys() else self.env['hostel.room']
+        if occupancy_fields & vals.keys():
+            self.env['hostel.hostel']._snapshot_room_contributions(old_rooms | old_rooms.browse(vals.get('room_id') or []))
+        # Changement de chambre : le séjour dans l'ancienne chambre passe dans l'historique, le nouveau commence aujourd'hui.
+        moved = self.browse()
+        if 'room_id' in vals:
+            today = fields.Date.context_today(self)
+            moved = self.filtered(lambda student: student.room_id.id != (vals['room_id'] or False))
+            self.env['hostel.stay.history']._record_room_moves(moved, today)
+        res = super().write(vals)
+        if moved and 'room_date' not in vals:
+            moved.write({'room_date': today if vals['room_id'] else False})
+        if occupancy_fields & vals.keys():
+            rooms = old_rooms | self.room_id
+            rooms._touch_occupancy()
+        return res
+
+    def unlink(self):
+        self.env['hostel.hostel']._snapshot_room_contributions(self.room_id)
+        self.room_id._touch_occupancy()
+        return super().unlink()
+
+    @api.depends('student_firstname', 'student_lastname')
+    def _compute_display_name(self):
+        """
+        Override de la méthode pour que 'display_name' (utilisé dans les champs Many2one) soit "Prénom Nom".
+        """
+        for record in self:
+            record.display_name = " ".join(filter(None, [record.student_firstname, record.student_lastname])) or False
+
+    # ===========
+    # Contraintes
+    # ===========
+
+    @api.model
+    def _get_current_occupant_domain(self, today):
+        """
+        Domaine des occupants actuels d'une chambre : les étudiants partis (date de départ passée) n'occupent plus de lit,
+        même s'ils gardent leur chambre jusqu'à leur archivage (cf. hostel.stay.history).
+        """
+        return ['|', ('discharge_date', '=', False), ('discharge_date', '>=', today)]
+
+    def _is_current_occupant(self, today):
+        return not self.discharge_date or self.discharge_date >= today
+
+    @api.constrains('room_id', 'discharge_date')
+    @hostel_profiled('constraint')
+    def _check_room_capacity(self):
+        """
+        Contrainte Python : une chambre ne peut pas avoir plus d'occupants actuels que 'student_per_room'.
+        Le comptage est fait en une requête groupée pour toutes les chambres concernées.
+
+        Seule, cette contrainte ne protège pas des écritures concurrentes (chaque transaction compte sur sa propre photo de la base).
+        Mais le changement de 'room_id' met aussi à jour la ligne hostel_room (champ stocké 'occupied_beds') :
+        deux transactions qui remplissent la même chambre se sérialisent donc sur cette ligne, et la seconde est rejouée.
+        """
+        rooms = self.room_id
+        if not rooms:
+            return
+        groups = self._read_group(
+            [('room_id', 'in', rooms.ids)] + self._get_current_occupant_domain(fields.Date.context_today(self)),
+            ['room_id'],
+            ['__count'],
+        )
+        overbooked = [room.display_name for room, count in groups if count > room.student_per_room]
+        if overbooked:
+            raise ValidationError("Error. Not enough free beds in: %s" % ", ".join(overbooked))
+
+    # ====================
+    # Affectation en masse
+    # ====================
+
+    @api.model
+    def _allocate_rooms(self, allocation):
+        """
+        Écrit les chambres d'un ensemble d'étudiants par lots groupés.
+
+        'allocation' est un dictionnaire {hostel.room: hostel.student} : on fait un write() par chambre (tous les étudiants d'un lot
+        reçoivent la même valeur), donc une requête UPDATE par chambre plutôt qu'une par étudiant.
+        Les champs dépendants ('availability', 'occupied_beds', 'hostel_id') ne sont que marqués à recalculer à chaque write() ;
+        le flush final les recalcule une seule fois pour l'ensemble des chambres touchées.
+        """
+        # Réservation gardée des lits (cf. hostel.room._reserve_beds) : protège contre les affectations concurrentes.
+        self.env['hostel.room']._reserve_beds(allocation)
+        for room, students in allocation.items():
+            if students:
+                students.write({'room_id': room.id})
+        self.env.flush_all()
+        return True
+
     # =================
     # Méthodes computes
     # =================
@@ -188,6 +380,7 @@ reste tout de même bien mystérieux.
     """
 
     @api.depends('admission_date', 'discharge_date')
+    @hostel_profiled('compute')
     def _compute_check_duration(self):
         """
         Méthode qui donne une valeur au champ 'duration'.
@@ -207,30 +400,62 @@ reste tout de même bien mystérieux.
         Ce comportement permet de faire en sorte que même lorsque la méthode compute n'assigne pas correctement sa valeur à un champ compute (if qui ne 
         se déclenche pas), le champ prenne sa valeur par défaut (0) plutôt qu'une ancienne valeur "périmée".
         """
+        today = fields.Date.context_today(self)
         for record in self:
-            if record.admission_date and record.discharge_date:
-                record.duration = (record.discharge_date - record.admission_date).days
+            record.duration = record._get_stay_duration(today)
+
+    def _get_stay_duration(self, today):
+        """
+        Durée du séjour en jours : jusqu'à la date de départ, ou jusqu'à aujourd'hui pour un séjour en cours.
+        """
+        if not self.admission_date:
+            return 0
+        return ((self.discharge_date or today) - self.admission_date).days
 
+    @hostel_profiled('call')
     def _inverse_duration(self):
         """
         Méthode qui donne une valeur à jour au champ 'discharge_date' lorsque le champ 'duration' change.
         Cette méthode est donc appelée à chaque fois que 'duration' change puis que l'on enregistre, ce qui arrive notamment quand :
         - on modifie 'duration' directement depuis l'interface
         - lorsque l'on modifie 'admission_date' ou 'discharge_date', ce qui active _compute_check_duration et met 'duration' à jour --> du coup duration change et appel donc cette méthode.
-        """
-        for record in self:
 
-            # Cas où il y a à la fois une date d'admission ET une date de départ
-            if record.discharge_date and record.admission_date:
+        La date de départ n'est modifiée que si la durée saisie ne correspond pas à celle calculée à partir des dates
+        (sinon, le simple fait d'enregistrer un séjour en cours lui donnerait une date de départ).
 
-                # On calcule alors le nombre de jours qui séparent la date d'admission et la date de départ
-                duration = (record.discharge_date - record.admission_date).days
+        Plutôt qu'une écriture par étudiant, les étudiants qui ont la même date d'admission et la même durée reçoivent
+        la même date de départ : on les regroupe et on fait un seul write() par groupe.
+        """
+        today = fields.Date.context_today(self)
+        groups = defaultdict(lambda: self.browse())
+        for record in self:
+            if record.admission_date and record.duration != record._get_stay_duration(today):
+                groups[(record.admission_date, record.duration)] |= record
 
-                # Si cet écart ne corresponds pas à la valeur du champ 'duration' (record.duration), alors on met à jour la date de départ. (elle vaut la date d'admission + la vraie duration (record.duration)).
-                if duration != record.duration:
-                    record.discharge_date = (record.admission_date + timedelta(days=record.duration)).strftime('%Y-%m-%d')
+        for (admission_date, duration), records in groups.items():
+            records.write({'discharge_date': admission_date + timedelta(days=duration)})
 
-            # Dans le cas où l'on met une durée et qu'il y a une date d'admission mais pas de date de départ, on vient mettre la date de départ à jour selon la même logique.
-            elif record.admission_date and not record.discharge_date:
-                record.discharge_date = (record.admission_date + timedelta(days=record.duration)).strftime('%Y-%m-%d')
+    # ==================
+    # Actions planifiées
+    # ==================
 
+    @api.model
+    def _cron_refresh_open_stay_duration(self):
+        """
+        Action planifiée (chaque nuit) : met à jour la durée des séjours en cours (sans date de départ).
+        La mise à jour est incrémentale : seules les lignes dont la durée a réellement changé sont écrites,
+        en une requête servie par l'index partiel 'hostel_student_open_stay_index'.
+        """
+        self.flush_model(['admission_date', 'discharge_date', 'duration'])
+        self.env.cr.execute(
+            """
+            UPDATE hostel_student
+               SET duration = %(today)s - admission_date
+             WHERE discharge_date IS NULL
+               AND admission_date IS NOT NULL
+               AND duration IS DISTINCT FROM %(today)s - admission_date
+         RETURNING id
+            """,
+            {'today': fields.Date.context_today(self)},
+        )
+        self.browse(row[0] for row in self.env.cr.fetchall()).invalidate_recordset(['duration'])
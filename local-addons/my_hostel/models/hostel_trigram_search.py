@@ -0,0 +1,82 @@
+from odoo import api, models
+from odoo.tools import SQL, create_index, escape_psql
+
+
+class HostelTrigramSearchMixin(models.AbstractModel):
+    _name = 'hostel.trigram.search.mixin'
+    _description = "Mixin adding a ranked trigram name search."
+
+    """
+Recherche floue (autocomplétion) sur plusieurs champs texte à la fois, pour hostel.hostel (nom + code + ville) et hostel.student (prénom + nom).
+
+Une recherche 'ilike %x%' ne peut pas utiliser un index btree : sur une grande table, PostgreSQL lit toutes les lignes.
+L'extension pg_trgm découpe le texte en trigrammes ('dup' -> '  d', ' du', 'dup', 'up ') et un index GIN sur ces trigrammes
+sert directement les opérateurs de similarité et les recherches ILIKE '%x%'.
+
+Le modèle qui hérite du mixin déclare les champs concaténés dans '_trigram_search_fields'. On crée alors :
+- un index GIN trigramme sur l'expression concaténée (COALESCE(champ1, '') || ' ' || COALESCE(champ2, '') ...) ;
+- une recherche par nom (_name_search) qui garde les lignes où chaque mot saisi apparaît (ILIKE '%mot%', comme la recherche standard),
+  ou proches du texte saisi avec l'opérateur '<%' (texte saisi <% expression : similarité avec un extrait de l'expression au moins égale
+  à '_trigram_search_threshold'), pour tolérer les fautes de frappe. L'index sert les deux conditions : seules les lignes retenues
+  sont lues et triées par similarité, puis la limite s'applique.
+
+Le ILIKE reste nécessaire : une saisie courte ou partielle ('Ro', début d'un code) a trop peu de trigrammes en commun avec
+l'expression pour atteindre le seuil de '<%', et ne trouverait rien.
+
+Le domaine (droits d'accès, règles, filtres de l'appelant) est traduit en SQL par _search() dans la même requête : la limite
+s'applique après tous les filtres.
+
+Si pg_trgm n'est pas disponible, l'index n'est pas créé : la recherche filtre avec un ILIKE par mot saisi et trie par id
+(elle reste correcte, mais lente).
+    """
+
+    # Champs (colonnes) concaténés pour la recherche, à définir dans le modèle qui hérite du mixin
+    _trigram_search_fields = []
+
+    # Seuil de similarité (pg_trgm.word_similarity_threshold) de l'opérateur '<%', entre 0 et 1 : plus il est bas, plus la recherche
+    # tolère de fautes de frappe, et plus l'index laisse de lignes à trier.
+    _trigram_search_threshold = 0.5
+
+    def _get_trigram_search_expression(self, alias=None):
+        prefix = f'"{alias}".' if alias else ''
+        return " || ' ' || ".join(f"COALESCE({prefix}{field_name}, '')" for field_name in self._trigram_search_fields)
+
+    def init(self):
+        super().init()
+        if self._abstract or not self._trigram_search_fields:
+            return
+        if not self.env.registry.has_trigram:
+            return
+        create_index(
+            self.env.cr,
+            indexname=f'{self._table}_trigram_search_index',
+            tablename=self._table,
+            expressions=[f'({self._get_trigram_search_expression()}) gin_trgm_ops'],
+            method='gin',
+        )
+
+    @api.model
+    def _name_search(self, name, domain=None, operator='ilike', limit=None, order=None):
+        terms = (name or '').split()
+        if operator != 'ilike' or not terms or not self._trigram_search_fields:
+            return super()._name_search(name, domain=domain, operator=operator, limit=limit, order=order)
+
+        self.flush_model(self._trigram_search_fields)
+        # Droits d'accès, règles et domaine : traduits en SQL par l'ORM, la recherche floue s'ajoute à la même requête.
+        query = self._search(domain or [], limit=limit)
+        expression = self._get_trigram_search_expression(self._table)
+        contains_terms = SQL(" AND ").join(
+            SQL(f"({expression}) ILIKE %s", f"%{escape_psql(term)}%") for term in terms
+        )
+        if self.env.registry.has_trigram:
+            # Seuil propre à la transaction (set_config(..., true)) : il ne modifie pas les autres connexions.
+            self.env.cr.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(self._trigram_search_threshold)],
+            )
+            text = " ".join(terms)
+            query.add_where(SQL(f"(%s <%% ({expression}) OR (%s))", text, contains_terms))
+            query.order = SQL(f'word_similarity(%s, ({expression})) DESC, "{self._table}".id', text)
+        else:
+            query.add_where(contains_terms)
+            query.order = SQL(f'"{self._table}".id')
+        return query
@@ -1,5 +1,6 @@
 from odoo import api, fields, models
-from odoo.exceptions import ValidationError
+from odoo.exceptions import UserError, ValidationError
+from .hostel_perf import hostel_profiled
 
 class HostelRoom(models.Model):
     _name = "hostel.room"
@@ -22,12 +23,17 @@ La contrainte est alors automatiquement revérifiée lorsque l'un des champs ind
     """
 
     @api.constrains('rent_amount')
+    @hostel_profiled('constraint')
     def _check_rent_amount_is_positive(self):
         """
         Contrainte Python pour vérifier que le montant du loyer est bien une valeur positive.
+        Attention : self peut contenir plusieurs enregistrements (create() en lot, import...), on vérifie donc tout le recordset.
         """
-        if self.rent_amount < 0:
-            raise ValidationError("Error. The rent amount should be a positive value.")
+        invalid_rooms = self.filtered(lambda room: room.rent_amount < 0)
+        if invalid_rooms:
+            raise ValidationError(
+                "Error. The rent amount should be a positive value (%s)." % ", ".join(invalid_rooms.mapped('display_name'))
+            )
 
     # ===============
     # Champs basiques
@@ -89,9 +95,21 @@ La contrainte est alors automatiquement revérifiée lorsque l'un des champs ind
         help="Student allocated per room",
     )
 
+    # 'occupied_beds' et 'availability' sont stockés et indexés : la recherche "chambre avec une place libre"
+    # devient une simple requête indexée ([('availability', '>', 0)]) et la vue liste ne charge plus les occupants.
+    occupied_beds = fields.Integer(
+        string="Occupied beds",
+        compute="_compute_check_availability",
+        store=True,
+        index=True,
+        help="Number of students currently living in the room",
+    )
+
     availability = fields.Float(
         string="Availability",
         compute="_compute_check_availability",
+        store=True,
+        index=True,
         help="Room availability in hostel",
     )
 
@@ -109,20 +127,446 @@ La contrainte est alors automatiquement revérifiée lorsque l'un des champs ind
         help="Select hostel room amenities",
     )
 
+    # Nombre d'équipements de la chambre, stocké pour classer les correspondances partielles (cf. search_by_amenities()).
+    amenity_count = fields.Integer(
+        string="Amenity count",
+        compute="_compute_amenity_count",
+        store=True,
+    )
+
+    # Champ de recherche uniquement : [('all_amenity_ids', 'in', [wifi_id, ac_id, desk_id])] donne les chambres qui ont TOUS ces équipements.
+    all_amenity_ids = fields.Many2many(
+        comodel_name='hostel.amenities',
+        string="Has All Amenities",
+        compute="_compute_all_amenity_ids",
+        search="_search_all_amenity_ids",
+    )
+
+    # =========
+    # Overrides
+    # =========
+
+    @hostel_profiled('call')
+    def write(self, vals):
+        """
+        Override de write() pour propager en masse le nouvel hostel aux étudiants des chambres déplacées.
+
+        Le champ related stocké hostel.student.hostel_id serait sinon recalculé étudiant par étudiant par l'ORM.
+        Comme toutes les chambres de self reçoivent le même 'hostel_id', une seule requête UPDATE suffit ;
+        on retire ensuite les étudiants concernés de la file de recalcul et on invalide leur cache.
+
+        Le changement d'hostel, de capacité, de loyer ou d'occupants modifie aussi les cumuls de l'hostel
+        (cf. hostel.hostel._apply_rollup_deltas()), et donc ceux de ses catégories au prochain passage de l'action planifiée.
+        """
+        if {'hostel_id', 'student_per_room', 'rent_amount', 'student_ids'} & vals.keys():
+            self.env['hostel.hostel']._snapshot_room_contributions(self)
+        res = super().write(vals)
+        if 'hostel_id' in vals and self:
+            self._sync_student_hostel(vals['hostel_id'] or None)
+        return res
+
+    @api.model_create_multi
+    @hostel_profiled('call')
+    def create(self, vals_list):
+        rooms = super().create(vals_list)
+        self.env['hostel.hostel']._snapshot_room_contributions(rooms, new=True)
+        return rooms
+
+    def unlink(self):
+        self.env['hostel.hostel']._snapshot_room_contributions(self)
+        return super().unlink()
+
+    def _sync_student_hostel(self, hostel_id):
+        """
+        Réécrit 'hostel_id' de tous les étudiants des chambres de self en une requête.
+        """
+        Student = self.env['hostel.student']
+        Student.flush_model(['room_id'])
+        self.env.cr.execute(
+            """
+            UPDATE hostel_student
+               SET hostel_id = %s
+             WHERE room_id IN %s
+               AND hostel_id IS DISTINCT FROM %s
+         RETURNING id
+            """,
+            (hostel_id, tuple(self.ids), hostel_id),
+        )
+        updated = Student.browse(row[0] for row in self.env.cr.fetchall())
+
+        # Le super().write() a mis les étudiants de ces chambres dans la file de recalcul : leur valeur est désormais à jour en base.
+        field = Student._fields['hostel_id']
+        pending = self.env.records_to_compute(field).filtered(lambda student: student.room_id in self)
+        self.env.remove_to_compute(field, pending)
+        (updated | pending).invalidate_recordset(['hostel_id'])
+
+    # =========================
+    # Recherche par équipements
+    # =========================
+
+    """
+Chercher les chambres avec le WiFi ET la climatisation ET un bureau avec le domaine standard
+([('hostel_amenities_ids', '=', wifi), ('hostel_amenities_ids', '=', ac), ...]) génère une sous-requête par équipement.
+
+Il s'agit en fait d'une "division relationnelle", qui se fait en une seule requête groupée sur la table de relation :
+
+    SELECT room_id FROM hostel_room_amenities_rel
+     WHERE amenity_id IN (wifi, ac, desk)
+  GROUP BY room_id
+    HAVING COUNT(*) = 3
+
+(la clé primaire (room_id, amenity_id) de la table garantit qu'un couple n'apparaît qu'une fois).
+    """
+
+    @api.model
+    def _get_amenity_matches(self, amenity_ids, min_matches, limit=None):
+        """
+        Retourne la liste des (room_id, nombre d'équipements demandés présents) des chambres qui ont au moins 'min_matches'
+        des équipements demandés, les meilleures correspondances d'abord (puis les chambres avec le moins d'équipements superflus).
+        """
+        self.flush_model(['hostel_amenities_ids', 'amenity_count'])
+        query = """
+            SELECT rel.room_id, COUNT(*) AS matches
+              FROM hostel_room_amenities_rel rel
+              JOIN hostel_room r ON r.id = rel.room_id
+             WHERE rel.amenity_id IN %s
+          GROUP BY rel.room_id, r.amenity_count
+            HAVING COUNT(*) >= %s
+          ORDER BY matches DESC, r.amenity_count, rel.room_id
+        """
+        params = [tuple(amenity_ids), min_matches]
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        self.env.cr.execute(query, params)
+        return self.env.cr.fetchall()
+
+    @api.model
+    def search_by_amenities(self, amenity_ids, min_matches=None, limit=None, domain=None):
+        """
+        Retourne les chambres qui ont au moins 'min_matches' des équipements demandés (par défaut : tous),
+        classées par nombre d'équipements correspondants puis par nombre d'équipements total.
+        'domain' permet de filtrer en plus (ex. [('availability', '>', 0)]).
+        """
+        amenity_ids = list(set(amenity_ids))
+        if not amenity_ids:
+            return self.search(domain or [], limit=limit)
+        min_matches = min_matches or len(amenity_ids)
+        # Avec un domaine supplémentaire, on ne peut pas limiter avant de filtrer.
+        matches = self._get_amenity_matches(amenity_ids, min_matches, limit=None if domain else limit)
+        ranked_ids = [room_id for room_id, _matches in matches]
+        # search() applique les droits d'accès et le domaine ; on réapplique ensuite l'ordre du classement.
+        allowed_ids = set(self.search([('id', 'in', ranked_ids)] + (domain or [])).ids)
+        result_ids = [room_id for room_id in ranked_ids if room_id in allowed_ids]
+        return self.browse(result_ids[:limit] if limit else result_ids)
+
+    def _search_all_amenity_ids(self, operator, value):
+        if operator in ('in', '=') and value and not isinstance(value, str):
+            amenity_ids = list({value} if isinstance(value, int) else set(value))
+            room_ids = [room_id for room_id, _matches in self._get_amenity_matches(amenity_ids, len(amenity_ids))]
+            return [('id', 'in', room_ids)]
+        # Autres opérateurs (recherche par nom...) : comportement standard du Many2many.
+        return [('hostel_amenities_ids', operator, value)]
+
+    def _touch_occupancy(self):
+        """
+        Met à jour 'write_date' des chambres dont les occupants ont changé.
+        Le recalcul des champs stockés ('availability', ...) ne touche pas à 'write_date' : sans cela, les validateurs HTTP
+        (ETag / Last-Modified) de l'API JSON ne verraient pas qu'un lit s'est libéré ou a été pris.
+        """
+        if not self.ids:
+            return
+        self.env.cr.execute(
+            "UPDATE hostel_room SET write_date = %s WHERE id IN %s",
+            (self.env.cr.now(), tuple(self.ids)),
+        )
+        self.invalidate_recordset(['write_date'])
+
     # =================
     # Méthodes computes
     # =================
 
-    @api.depends('student_per_room', 'student_ids')
+    @api.depends('hostel_amenities_ids')
+    def _compute_amenity_count(self):
+        for record in self:
+            record.amenity_count = len(record.hostel_amenities_ids)
+
+    @api.depends('hostel_amenities_ids')
+    def _compute_all_amenity_ids(self):
+        for record in self:
+            record.all_amenity_ids = record.hostel_amenities_ids
+
+    @api.depends('student_per_room', 'student_ids', 'student_ids.discharge_date')
+    @hostel_profiled('compute')
     def _compute_check_availability(self):
         """
-        Méthode qui donne une valeur au champ compute 'availability'.
+        Méthode qui donne une valeur aux champs compute 'occupied_beds' et 'availability'.
         Ce champ indique le nombre de place restante dans la chambre, en prenant en compte le nombre maximal et le nombre de résidants actuels.
 
         Les champs indiqués dans le @api.depends() sont très utiles car ils permettent de définir par rapport à quels autres champ notre champ 'availabilty'
         est calculé. Lorsque l'un d'en eux change, 'availability' est recalculé.
+        Comme les champs sont stockés, la dépendance sur le One2many 'student_ids' fait que le changement de 'room_id' d'un étudiant
+        marque à recalculer l'ancienne et la nouvelle chambre.
+
+        Plutôt que de faire un len(record.student_ids) par chambre (ce qui charge tous les occupants de chaque chambre),
+        on fait UN SEUL comptage groupé (_read_group) pour tout le lot de chambres.
+        Les enregistrements virtuels (NewId, formulaire non enregistré) n'existent pas en base : pour eux on garde le calcul en mémoire.
 
-        Un champ compute est readonly par défaut car l'utilisateur n'a a priori (sauf certains cas) pas à venir y définir une valeur lui même.
+        Un étudiant parti (date de départ passée) garde sa chambre jusqu'à son archivage (cf. hostel.stay.history) mais n'occupe plus de lit :
+        seuls les occupants actuels sont comptés (cf. hostel.student._get_current_occupant_domain()).
+        Le passage des dates est pris en compte chaque nuit par l'action planifiée _cron_release_discharged_beds().
         """
+        Student = self.env['hostel.student']
+        today = fields.Date.context_today(self)
+        stored_rooms = self.filtered('id')
+        counts = {}
+        if stored_rooms:
+            groups = Student._read_group(
+                domain=[('room_id', 'in', stored_rooms.ids)] + Student._get_current_occupant_domain(today),
+                groupby=['room_id'],
+                aggregates=['__count'],
+            )
+            counts = {room.id: count for room, count in groups}
+
         for record in self:
-            record.availability = record.student_per_room - len(record.student_ids.ids)
+            if record.id:
+                occupied = counts.get(record.id, 0)
+            else:
+                occupied = len(record.student_ids.filtered(lambda student: student._is_current_occupant(today)))
+            record.occupied_beds = occupied
+            record.availability = record.student_per_room - occupied
+
+    @api.model
+    def _cron_release_discharged_beds(self):
+        """
+        Action planifiée (chaque nuit) : libère les lits des étudiants dont la date de départ vient de passer.
+        'occupied_beds' est stocké : seules les chambres dont la valeur stockée ne correspond plus aux occupants actuels
+        sont recalculées. Elles sont cherchées parmi les chambres des étudiants partis et pas encore archivés
+        (index partiel 'hostel_student_discharge_index').
+        """
+        self.env['hostel.student'].flush_model(['room_id', 'discharge_date'])
+        self.flush_model(['occupied_beds'])
+        self.env.cr.execute(
+            """
+            SELECT r.id
+              FROM hostel_room r
+             WHERE r.id IN (SELECT room_id FROM hostel_student WHERE discharge_date < %(today)s AND room_id IS NOT NULL)
+               AND r.occupied_beds IS DISTINCT FROM (
+                    SELECT COUNT(*) FROM hostel_student s
+                     WHERE s.room_id = r.id
+                       AND (s.discharge_date IS NULL OR s.discharge_date >= %(today)s)
+                   )
+            """,
+            {'today': fields.Date.context_today(self)},
+        )
+        rooms = self.browse(row[0] for row in self.env.cr.fetchall())
+        if not rooms:
+            return
+        # Même suivi que write() : cumuls des hostels (deltas) et 'write_date' pour l'API.
+        self.env['hostel.hostel']._snapshot_room_contributions(rooms)
+        self.env.add_to_compute(self._fields['occupied_beds'], rooms)
+        rooms.flush_recordset(['occupied_beds', 'availability'])
+        rooms._touch_occupancy()
+
+    # =========================
+    # Moteur d'occupation datée
+    # =========================
+
+    """
+Le champ 'availability' ne regarde que les occupants actuels. Pour répondre à "quelles chambres ont un lit libre du 1er septembre au 30 novembre",
+il faut tenir compte de 'admission_date' et 'discharge_date' des étudiants.
+
+Le pic d'occupation d'une chambre sur une période est calculé directement en base (sans charger un seul hostel.student) :
+
+1) on ne garde que les séjours qui chevauchent la période : admission_date <= date_to ET (discharge_date IS NULL OU discharge_date >= date_from).
+   Cette condition est servie par l'index (room_id, admission_date, discharge_date) créé dans hostel.student.init().
+2) chaque séjour, borné à la période, devient deux évènements : +1 le jour d'arrivée et -1 le lendemain du départ
+   (le lit est considéré occupé jusqu'à 'discharge_date' inclus ; un séjour sans date de départ court jusqu'à la fin de la période).
+3) une somme cumulée (fonction de fenêtre) par chambre, triée par date puis par delta (les départs avant les arrivées le même jour),
+   donne la charge de la chambre à chaque évènement. Son maximum est le pic d'occupation.
+    """
+
+    _OCCUPANCY_PEAK_QUERY = """
+        WITH stays AS (
+            -- Le séjour dans la chambre commence à l'admission, ou à l'arrivée dans la chambre ('room_date') si elle est postérieure.
+            -- La condition sur 'admission_date' seule est redondante avec GREATEST(), mais c'est elle que l'index peut servir.
+            SELECT s.room_id,
+                   GREATEST(s.admission_date, s.room_date, %(date_from)s::date) AS start_date,
+                   LEAST(COALESCE(s.discharge_date, %(date_to)s::date), %(date_to)s::date) AS end_date
+              FROM hostel_student s
+              JOIN hostel_room r ON r.id = s.room_id
+             WHERE s.admission_date <= %(date_to)s::date
+               AND GREATEST(s.admission_date, s.room_date) <= %(date_to)s::date
+               AND (s.discharge_date IS NULL OR s.discharge_date >= %(date_from)s::date)
+               AND {room_filter}
+             UNION ALL
+            -- Séjours archivés et changements de chambre (cf. hostel.stay.history) : ils comptent toujours pour les périodes passées.
+            SELECT h.room_id,
+                   GREATEST(h.admission_date, h.room_date, %(date_from)s::date),
+                   LEAST(h.discharge_date, %(date_to)s::date)
+              FROM hostel_stay_history h
+              JOIN hostel_room r ON r.id = h.room_id
+             WHERE h.admission_date <= %(date_to)s::date
+               AND GREATEST(h.admission_date, h.room_date) <= %(date_to)s::date
+               AND h.discharge_date >= %(date_from)s::date
+               AND {room_filter}
+        ),
+        events AS (
+            SELECT room_id, start_date AS day, 1 AS delta FROM stays
+            UNION ALL
+            SELECT room_id, end_date + 1 AS day, -1 AS delta FROM stays
+        ),
+        loads AS (
+            SELECT room_id,
+                   SUM(delta) OVER (PARTITION BY room_id ORDER BY day, delta ROWS UNBOUNDED PRECEDING) AS load
+              FROM events
+        ),
+        peaks AS (
+            SELECT room_id, MAX(load) AS peak
+              FROM loads
+          GROUP BY room_id
+        )
+    """
+
+    def _occupancy_query_params(self, date_from, date_to, hostel_ids=None):
+        """
+        Prépare le filtre sur les chambres et les paramètres communs aux requêtes d'occupation.
+        Si le recordset n'est pas vide, seules ses chambres sont considérées ; sinon on filtre (éventuellement) par hostel.
+        """
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        if not date_from or not date_to or date_from > date_to:
+            raise UserError("Error. The period is invalid: the start date must be before the end date.")
+
+        # Les requêtes SQL lisent la base directement : il faut d'abord y écrire ce que l'ORM garde encore en cache.
+        self.env['hostel.student'].flush_model(['room_id', 'admission_date', 'room_date', 'discharge_date'])
+        self.env['hostel.stay.history'].flush_model(['room_id', 'admission_date', 'room_date', 'discharge_date'])
+        self.flush_model(['hostel_id', 'student_per_room'])
+
+        room_filter = "TRUE"
+        params = {'date_from': date_from, 'date_to': date_to}
+        if self:
+            room_filter = "r.id IN %(room_ids)s"
+            params['room_ids'] = tuple(self.ids)
+        elif hostel_ids:
+            room_filter = "r.hostel_id IN %(hostel_ids)s"
+            params['hostel_ids'] = tuple(hostel_ids)
+        return room_filter, params
+
+    def get_peak_occupancy(self, date_from, date_to, hostel_ids=None):
+        """
+        Retourne un dictionnaire {room_id: pic d'occupation} sur la période [date_from, date_to] (bornes incluses).
+        Les chambres sans aucun séjour sur la période n'apparaissent pas dans le dictionnaire (pic = 0).
+        """
+        room_filter, params = self._occupancy_query_params(date_from, date_to, hostel_ids)
+        query = self._OCCUPANCY_PEAK_QUERY.format(room_filter=room_filter) + "SELECT room_id, peak FROM peaks"
+        self.env.cr.execute(query, params)
+        return dict(self.env.cr.fetchall())
+
+    @hostel_profiled('call')
+    def get_free_rooms(self, date_from, date_to, hostel_ids=None):
+        """
+        Retourne les chambres qui ont au moins un lit libre pendant TOUTE la période [date_from, date_to],
+        c'est à dire dont le pic d'occupation reste inférieur à 'student_per_room'.
+
+        Exemple :
+        self.env['hostel.room'].get_free_rooms('2024-09-01', '2024-11-30', hostel_ids=[1, 2])
+
+        Le filtrage est fait en base ; on repasse ensuite par search() pour appliquer les droits d'accès et les règles.
+        """
+        room_filter, params = self._occupancy_query_params(date_from, date_to, hostel_ids)
+        query = self._OCCUPANCY_PEAK_QUERY.format(room_filter=room_filter) + """
+            SELECT r.id
+              FROM hostel_room r
+         LEFT JOIN peaks p ON p.room_id = r.id
+             WHERE {room_filter}
+               AND r.student_per_room > COALESCE(p.peak, 0)
+        """.format(room_filter=room_filter)
+        self.env.cr.execute(query, params)
+        room_ids = [row[0] for row in self.env.cr.fetchall()]
+        return self.search([('id', 'in', room_ids)])
+
+    # ====================
+    # Réservation des lits
+    # ====================
+
+    """
+Deux workers qui affectent en même temps le dernier lit libre d'une chambre lisent chacun "1 place libre" et écrivent chacun leur étudiant :
+la chambre est alors sur-réservée. Un contrôle Python seul (lire puis écrire) ne suffit pas.
+
+La réservation passe donc par une mise à jour conditionnelle de la ligne de la chambre :
+
+    UPDATE hostel_room SET occupied_beds = occupied_beds + n ... WHERE id = X AND student_per_room - occupied_beds >= n
+
+- la condition est évaluée par PostgreSQL sur la ligne, qui est verrouillée par l'UPDATE jusqu'à la fin de la transaction ;
+- une transaction concurrente sur la même chambre attend ce verrou. Odoo travaillant en REPEATABLE READ, elle échoue ensuite avec une erreur
+  de sérialisation et la requête HTTP est rejouée automatiquement par Odoo : elle voit alors la nouvelle occupation ;
+- seules les lignes des chambres concernées sont verrouillées : des réservations sur des chambres différentes ne se bloquent pas,
+  même dans un même hostel. Les cumuls de l'hostel ne sont pas mis à jour dans la transaction, seulement enregistrés en deltas
+  (cf. hostel.hostel._apply_rollup_deltas()) : la ligne de l'hostel n'est pas verrouillée.
+
+Pour éviter les deadlocks entre deux réservations multi-chambres, les lignes sont d'abord verrouillées dans l'ordre des ids.
+    """
+
+    def reserve_beds(self, students):
+        """
+        Réserve un lit dans la chambre (self) pour chacun des étudiants donnés et les y affecte.
+        Lève une UserError si la chambre n'a plus assez de lits libres.
+        """
+        self.ensure_one()
+        self._reserve_beds({self: students})
+        students.write({'room_id': self.id})
+        return True
+
+    @api.model
+    @hostel_profiled('call')
+    def _reserve_beds(self, allocation):
+        """
+        Réserve les lits de plusieurs chambres en une seule requête gardée.
+        'allocation' est un dictionnaire {hostel.room: hostel.student}. Cette méthode ne fait que réserver les places (occupied_beds) :
+        c'est à l'appelant d'écrire ensuite 'room_id' sur les étudiants (le recalcul de 'occupied_beds' retombe alors sur la même valeur).
+        """
+        requested = {
+            room.id: len(students.filtered(lambda student: student.room_id != room))
+            for room, students in allocation.items()
+        }
+        requested = {room_id: count for room_id, count in requested.items() if count}
+        if not requested:
+            return True
+
+        rooms = self.browse(sorted(requested))
+        # Contribution des chambres aux cumuls de leur hostel, avant la réservation (cf. hostel.hostel._apply_rollup_deltas()).
+        self.env['hostel.hostel']._snapshot_room_contributions(rooms)
+        # Les compteurs en base doivent être à jour avant la mise à jour conditionnelle.
+        rooms.flush_recordset(['student_per_room', 'occupied_beds', 'availability'])
+
+        self.env.cr.execute(
+            "SELECT id FROM hostel_room WHERE id IN %s ORDER BY id FOR NO KEY UPDATE",
+            (tuple(rooms.ids),),
+        )
+        values = ", ".join(["(%s, %s)"] * len(requested))
+        params = [value for item in sorted(requested.items()) for value in item]
+        # Savepoint : si une chambre est pleine, les places réservées dans les autres sont annulées,
+        # même si l'appelant intercepte l'exception et poursuit la transaction.
+        with self.env.cr.savepoint():
+            self.env.cr.execute(
+                f"""
+                UPDATE hostel_room r
+                   SET occupied_beds = r.occupied_beds + v.beds,
+                       availability = r.availability - v.beds
+                  FROM (VALUES {values}) AS v(id, beds)
+                 WHERE r.id = v.id
+                   AND r.student_per_room - r.occupied_beds >= v.beds
+             RETURNING r.id
+                """,
+                params,
+            )
+            reserved = {row[0] for row in self.env.cr.fetchall()}
+            rooms.invalidate_recordset(['occupied_beds', 'availability'])
+
+            full_rooms = rooms.filtered(lambda room: room.id not in reserved)
+            if full_rooms:
+                raise UserError(
+                    "Error. Not enough free beds in: %s" % ", ".join(full_rooms.mapped('display_name'))
+                )
+        return True
@@ -0,0 +1 @@
+from . import hostel_occupancy_report
@@ -0,0 +1,52 @@
+from odoo import fields, models, tools
+
+
+class HostelOccupancyReport(models.Model):
+    _name = 'hostel.occupancy.report'
+    _description = "Occupancy and revenue report per hostel."
+    _auto = False
+    _order = 'occupancy_rate desc'
+
+    """
+Modèle de reporting (vue SQL, _auto = False) pour le tableau de bord multi-hostels.
+
+La vue ne fait que relire les cumuls stockés sur hostel.hostel (tenus à jour par deltas) : une ligne par hostel,
+sans aucune jointure sur les chambres ou les étudiants. Les vues pivot et graph s'appuient dessus.
+    """
+
+    hostel_id = fields.Many2one(string="Hostel", comodel_name='hostel.hostel', readonly=True)
+    category_id = fields.Many2one(string="Category", comodel_name='hostel.category', readonly=True)
+    type = fields.Selection(
+        selection=[("male", "Boys"), ("female", "Girls"), ("common", "Common")],
+        string="Type",
+        readonly=True,
+    )
+    city = fields.Char(string="City", readonly=True)
+    country_id = fields.Many2one(string="Country", comodel_name='res.country', readonly=True)
+    room_count = fields.Integer(string="Rooms", readonly=True)
+    bed_count = fields.Integer(string="Beds", readonly=True)
+    occupied_bed_count = fields.Integer(string="Occupied Beds", readonly=True)
+    free_bed_count = fields.Integer(string="Free Beds", readonly=True)
+    occupancy_rate = fields.Float(string="Occupancy Rate (%)", readonly=True, group_operator='avg')
+    expected_monthly_rent = fields.Float(string="Expected Monthly Rent", readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT h.id,
+                       h.id AS hostel_id,
+                       h.category_id,
+                       h.type,
+                       h.city,
+                       h.country_id,
+                       h.room_count,
+                       h.bed_count,
+                       h.occupied_bed_count,
+                       h.bed_count - h.occupied_bed_count AS free_bed_count,
+                       CASE WHEN h.bed_count > 0 THEN 100.0 * h.occupied_bed_count / h.bed_count ELSE 0 END AS occupancy_rate,
+                       h.expected_monthly_rent
+                  FROM hostel_hostel h
+                 WHERE h.active
+            )
+        """)
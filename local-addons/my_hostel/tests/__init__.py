@@ -0,0 +1,10 @@
+from . import test_performance
+from . import test_reference_cache
+from . import test_room_reservation
+from . import test_rent
+from . import test_jobs
+from . import test_geolocation
+from . import test_hostel_rollups
+from . import test_trigram_search
+from . import test_category_tree
+from . import test_stay_history
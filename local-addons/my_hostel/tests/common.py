@@ -0,0 +1,144 @@
+import logging
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from odoo.tests.common import TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+# Volume de données généré : nombre d'étudiants (le reste est proportionnel).
+# On choisit l'échelle avec la variable d'environnement HOSTEL_BENCH_SCALE (1k, 10k ou 100k).
+BENCH_SCALES = {
+    '1k': 1000,
+    '10k': 10000,
+    '100k': 100000,
+}
+
+# Taille des lots de create() du générateur
+CREATE_BATCH_SIZE = 5000
+
+
+class HostelDataGenerator:
+    """
+    Générateur de données synthétiques pour les benchmarks : un arbre de catégories, des équipements, des hostels,
+    des chambres et des étudiants (dont une partie déjà placée). Les données sont reproductibles (graine fixe).
+
+    Pour N étudiants : N / 100 hostels, N / 2 chambres de 4 lits, 80% des étudiants placés (3 par chambre) : un tiers des chambres reste vide.
+    """
+
+    def __init__(self, env, student_count, seed=42):
+        self.env = env
+        self.student_count = student_count
+        self.random = random.Random(seed)
+
+    def _create_in_batches(self, model_name, vals_list):
+        records = self.env[model_name]
+        for start in range(0, len(vals_list), CREATE_BATCH_SIZE):
+            records |= self.env[model_name].create(vals_list[start:start + CREATE_BATCH_SIZE])
+        return records
+
+    def generate(self):
+        env = self.env
+        data = {}
+
+        # Arbre de catégories : 1 racine, 5 enfants, 5 petits-enfants par enfant.
+        root = env['hostel.category'].create({'name': "Bench Root"})
+        children = env['hostel.category'].create([{'name': f"Bench {i}", 'parent_id': root.id} for i in range(5)])
+        leaves = env['hostel.category'].create([
+            {'name': f"Bench {child.name}.{i}", 'parent_id': child.id} for child in children for i in range(5)
+        ])
+        data['root_category'] = root
+        data['categories'] = root | children | leaves
+
+        data['amenities'] = env['hostel.amenities'].create([
+            {'name': name, 'active': True} for name in ("WiFi", "AC", "Desk", "Heating", "Balcony", "Shower", "TV", "Fridge")
+        ])
+
+        hostel_count = max(self.student_count // 100, 2)
+        data['hostels'] = self._create_in_batches('hostel.hostel', [{
+            'name': f"Bench Hostel {i}",
+            'hostel_code': f"BH{i:05d}",
+            'phone': "0000",
+            'mobile': "0000",
+            'city': self.random.choice(["Paris", "Lyon", "Lille", "Nantes", "Bordeaux"]),
+            'type': self.random.choice(['male', 'female', 'common']),
+            'category_id': self.random.choice(leaves).id,
+        } for i in range(hostel_count)])
+
+        room_count = max(self.student_count // 2, 20)
+        env.cr.execute("SELECT COALESCE(MAX(room_no), 0) FROM hostel_room")
+        first_room_no = env.cr.fetchone()[0] + 1
+        amenity_ids = data['amenities'].ids
+        hostel_ids = data['hostels'].ids
+        data['rooms'] = self._create_in_batches('hostel.room', [{
+            'name': f"Bench Room {i}",
+            'room_no': first_room_no + i,
+            'floor_no': self.random.randint(0, 5),
+            'student_per_room': 4,
+            'rent_amount': self.random.choice([300, 400, 500]),
+            'hostel_id': hostel_ids[i % len(hostel_ids)],
+            'hostel_amenities_ids': [(6, 0, self.random.sample(amenity_ids, self.random.randint(0, 4)))],
+        } for i in range(room_count)])
+
+        room_ids = data['rooms'].ids
+        admission_dates = [date(2024, 9, 1) + timedelta(days=7 * week) for week in range(10)]
+        students_vals = []
+        for i in range(self.student_count):
+            admission_date = self.random.choice(admission_dates)
+            students_vals.append({
+                'student_firstname': f"First{i}",
+                'student_lastname': f"Last{i}",
+                'gender': self.random.choice(['male', 'female', 'other']),
+                'admission_date': admission_date,
+                'discharge_date': admission_date + timedelta(days=self.random.randint(30, 300)) if i % 2 else False,
+                # Placement 3 étudiants par chambre (jamais plus que la capacité), 80% des étudiants placés
+                'room_id': room_ids[i // 3] if i % 5 and i // 3 < len(room_ids) else False,
+            })
+        data['students'] = self._create_in_batches('hostel.student', students_vals)
+        env.flush_all()
+        return data
+
+
+class HostelPerformanceCase(TransactionCase):
+    """
+    Classe de base des benchmarks : génère les données une fois pour la classe et fournit les mesures
+    (temps et nombre de requêtes SQL) ainsi que l'assertion anti N+1.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.scale = os.environ.get('HOSTEL_BENCH_SCALE', '1k')
+        start = time.perf_counter()
+        cls.data = HostelDataGenerator(cls.env, BENCH_SCALES[cls.scale]).generate()
+        _logger.info("hostel bench [%s]: data generated in %.2fs", cls.scale, time.perf_counter() - start)
+
+    def measure(self, label, func):
+        """
+        Exécute func() à froid (cache de l'ORM vidé) et retourne le nombre de requêtes SQL exécutées, flush compris.
+        Le temps et le nombre de requêtes sont écrits dans le log.
+        """
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries_before = self.cr.sql_log_count
+        start = time.perf_counter()
+        func()
+        self.env.flush_all()
+        elapsed = time.perf_counter() - start
+        queries = self.cr.sql_log_count - queries_before
+        _logger.info("hostel bench [%s] %s: %.3fs, %s queries", self.scale, label, elapsed, queries)
+        return queries
+
+    def assertNoNPlusOne(self, label, small, large, tolerance=2):
+        """
+        Vérifie qu'un chemin de code ne fait pas une requête par enregistrement :
+        le même traitement sur un petit et sur un grand lot doit faire (à 'tolerance' près) le même nombre de requêtes.
+        """
+        small_queries = self.measure(f"{label} (small batch)", small)
+        large_queries = self.measure(f"{label} (large batch)", large)
+        self.assertLessEqual(
+            large_queries, small_queries + tolerance,
+            f"{label}: {large_queries} queries on the large batch vs {small_queries} on the small one (N+1 query pattern)",
+        )
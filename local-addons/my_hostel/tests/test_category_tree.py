@@ -0,0 +1,49 @@
+from odoo.exceptions import AccessError, ValidationError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestCategoryTree(TransactionCase):
+
+    """
+Déplacement d'une branche de l'arbre des catégories (cf. hostel.category.move_subtree()). Arbre de test : root > (a > a1 > a2), b.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Category = cls.env['hostel.category']
+        cls.root = Category.create({'name': "Tree Root"})
+        cls.a, cls.b = Category.create([{'name': "Tree A", 'parent_id': cls.root.id}, {'name': "Tree B", 'parent_id': cls.root.id}])
+        cls.a1 = Category.create({'name': "Tree A1", 'parent_id': cls.a.id})
+        cls.a2 = Category.create({'name': "Tree A2", 'parent_id': cls.a1.id})
+
+    def test_move_rewrites_paths_of_whole_branch(self):
+        self.a1.move_subtree(self.b)
+        self.assertEqual(self.a1.parent_id, self.b)
+        self.assertEqual(self.a1.parent_path, f"{self.b.parent_path}{self.a1.id}/")
+        self.assertEqual(self.a2.parent_path, f"{self.a1.parent_path}{self.a2.id}/")
+        self.assertEqual(self.env['hostel.category'].search([('id', 'child_of', self.a.id)]), self.a)
+        self.assertEqual(self.env['hostel.category'].search([('id', 'child_of', self.b.id)]), self.b | self.a1 | self.a2)
+
+    def test_move_to_root(self):
+        self.a1.move_subtree(self.env['hostel.category'])
+        self.assertFalse(self.a1.parent_id)
+        self.assertEqual(self.a1.parent_path, f"{self.a1.id}/")
+        self.assertEqual(self.a2.parent_path, f"{self.a1.id}/{self.a2.id}/")
+
+    def test_move_under_own_descendant_is_refused(self):
+        with self.assertRaises(ValidationError):
+            self.a.move_subtree(self.a2)
+        self.assertEqual(self.a.parent_id, self.root)
+
+    def test_move_requires_write_access(self):
+        user = self.env['res.users'].create({
+            'name': "Tree Reader",
+            'login': 'hostel_tree_reader',
+            'groups_id': [(6, 0, [self.env.ref('base.group_user').id, self.env.ref('my_hostel.group_hostel_user').id])],
+        })
+        with self.assertRaises(AccessError):
+            self.a1.with_user(user).move_subtree(self.b)
+        self.assertEqual(self.a1.parent_id, self.a)
@@ -0,0 +1,62 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestGeolocation(TransactionCase):
+
+    """
+Géolocalisation des hostels et recherche des plus proches (cf. hostel.hostel.search_nearest()), autour d'un code postal de test
+placé en (48, 2), loin des codes postaux livrés avec le module.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.country = cls.env.ref('base.fr')
+        cls.env['hostel.postcode'].create({
+            'country_id': cls.country.id, 'zip': '99001', 'name': "Geo Test", 'latitude': 48.0, 'longitude': 2.0,
+        })
+        Hostel = cls.env['hostel.hostel']
+        common = {'phone': "0000", 'mobile': "0000"}
+        cls.hostel_zip = Hostel.create(dict(common, name="Geo Zip", hostel_code="GZ", zip='99001', country_id=cls.country.id))
+        cls.hostel_manual = Hostel.create(dict(common, name="Geo Manual", hostel_code="GM", latitude=48.01, longitude=2.0))
+        cls.hostel_none = Hostel.create(dict(common, name="Geo None", hostel_code="GN"))
+
+    def _nearest(self, latitude=48.0, longitude=2.0, **kwargs):
+        return [hostel for hostel, _distance in self.env['hostel.hostel'].search_nearest(latitude, longitude, **kwargs)]
+
+    def test_postcode_and_manual_coordinates_are_geolocated(self):
+        self.assertTrue(self.hostel_zip.geolocated)
+        self.assertEqual((self.hostel_zip.latitude, self.hostel_zip.longitude), (48.0, 2.0))
+        self.assertTrue(self.hostel_manual.geolocated)
+
+    def test_hostel_without_coordinates_is_left_out(self):
+        self.assertFalse(self.hostel_none.geolocated)
+        # Ses coordonnées valent (0, 0) en base : la recherche autour de ce point ne doit pas le trouver.
+        self.assertNotIn(self.hostel_none, self._nearest(0.0, 0.0, radius_km=50))
+
+    def test_geolocate_missing_uses_new_postcodes(self):
+        hostel = self.env['hostel.hostel'].create({
+            'name': "Geo Later", 'hostel_code': "GL", 'phone': "0000", 'mobile': "0000", 'zip': '99002', 'country_id': self.country.id,
+        })
+        self.assertFalse(hostel.geolocated)
+        self.env['hostel.postcode'].create({
+            'country_id': self.country.id, 'zip': '99002', 'latitude': 47.0, 'longitude': 1.0,
+        })
+        self.env['hostel.hostel']._geolocate_missing()
+        self.assertTrue(hostel.geolocated)
+        self.assertEqual(hostel.latitude, 47.0)
+
+    def test_search_nearest_orders_by_distance(self):
+        result = self.env['hostel.hostel'].search_nearest(48.0, 2.0, radius_km=5)
+        self.assertEqual([hostel for hostel, _distance in result], [self.hostel_zip, self.hostel_manual])
+        self.assertAlmostEqual(result[0][1], 0.0, places=3)
+        self.assertAlmostEqual(result[1][1], 1.11, places=2)
+
+    def test_search_nearest_applies_domain_before_limit(self):
+        self.assertEqual(self._nearest(radius_km=5, limit=1, domain=[('id', '!=', self.hostel_zip.id)]), [self.hostel_manual])
+
+    def test_search_nearest_from_antipode(self):
+        # Point opposé : l'argument de asin() vaut 1 (aux arrondis près).
+        self.assertEqual(self._nearest(-48.0, -178.0, radius_km=20100, domain=[('id', '=', self.hostel_zip.id)]), [self.hostel_zip])
@@ -0,0 +1,129 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestHostelRollups(TransactionCase):
+
+    """
+Cumuls des hostels (cf. hostel.hostel._apply_rollup_deltas()) : les deltas des chambres sont enregistrés en fin de transaction,
+puis intégrés aux hostels par l'action planifiée. cr.flush() exécute les précommits comme la fin d'une transaction.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.hostel = cls.env['hostel.hostel'].create({
+            'name': "Rollup Hostel", 'hostel_code': "RH", 'phone': "0000", 'mobile': "0000",
+        })
+        cls.student = cls.env['hostel.student'].create({'student_firstname': "Rollup", 'student_lastname': "Test"})
+
+    def _create_room(self, room_no=99101):
+        return self.env['hostel.room'].create({
+            'name': f"Rollup Room {room_no}", 'room_no': room_no, 'floor_no': 1, 'student_per_room': 4,
+            'rent_amount': 300, 'hostel_id': self.hostel.id,
+        })
+
+    def _refresh(self):
+        self.env.cr.flush()
+        self.env['hostel.hostel']._cron_refresh_rollups()
+
+    def _get_rollups(self):
+        return (self.hostel.room_count, self.hostel.bed_count, self.hostel.occupied_bed_count, self.hostel.expected_monthly_rent)
+
+    def test_new_hostel_starts_at_zero(self):
+        self.env.cr.flush()
+        self.env.cr.execute("SELECT room_count, bed_count FROM hostel_hostel WHERE id = %s", [self.hostel.id])
+        self.assertEqual(self.env.cr.fetchone(), (0, 0))
+
+    def test_room_is_counted_after_refresh(self):
+        self._create_room()
+        self._refresh()
+        self.assertEqual(self._get_rollups(), (1, 4, 0, 0.0))
+
+    def test_reservation_updates_occupancy_and_rent(self):
+        room = self._create_room()
+        self._refresh()
+        room.reserve_beds(self.student)
+        self._refresh()
+        self.assertEqual(self._get_rollups(), (1, 4, 1, 300.0))
+
+    def test_reservation_does_not_write_hostel_row(self):
+        room = self._create_room()
+        self._refresh()
+        self.env.cr.execute("SELECT xmin::text FROM hostel_hostel WHERE id = %s", [self.hostel.id])
+        xmin = self.env.cr.fetchone()[0]
+        room.reserve_beds(self.student)
+        self.env.cr.flush()
+        self.env.cr.execute("SELECT xmin::text FROM hostel_hostel WHERE id = %s", [self.hostel.id])
+        self.assertEqual(self.env.cr.fetchone()[0], xmin)
+
+    def test_pending_deltas_are_included_in_full_recompute(self):
+        self._create_room()
+        self._create_room(99102)
+        self.env.cr.flush()
+        self.env['hostel.hostel']._recompute_all_rollups()
+        # Les deltas en attente sont supprimés par le recalcul complet : l'action planifiée ne les compte pas deux fois.
+        self.env['hostel.hostel']._cron_refresh_rollups()
+        self.assertEqual(self._get_rollups(), (2, 8, 0, 0.0))
+
+
+@tagged('post_install', '-at_install')
+class TestCategoryRollups(TransactionCase):
+
+    """
+Cumuls des catégories (cf. hostel.category._refresh_all_rollups()) : recalculés par l'action planifiée à partir des cumuls des hostels,
+pour la catégorie et toutes ses descendantes. Arbre de test : root > (left > leaf), right.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Category = cls.env['hostel.category']
+        cls.root = Category.create({'name': "Rollup Root"})
+        cls.left, cls.right = Category.create([
+            {'name': "Rollup Left", 'parent_id': cls.root.id}, {'name': "Rollup Right", 'parent_id': cls.root.id},
+        ])
+        cls.leaf = Category.create({'name': "Rollup Leaf", 'parent_id': cls.left.id})
+        cls.hostel = cls.env['hostel.hostel'].create({
+            'name': "Rollup Leaf Hostel", 'hostel_code': "RLH", 'phone': "0000", 'mobile': "0000", 'category_id': cls.leaf.id,
+        })
+        cls.env['hostel.room'].create({
+            'name': "Rollup Leaf Room", 'room_no': 99201, 'floor_no': 1, 'student_per_room': 4, 'hostel_id': cls.hostel.id,
+        })
+
+    def _refresh(self):
+        self.env.cr.flush()
+        self.env['hostel.hostel']._cron_refresh_rollups()
+
+    def _get_rollups(self, category):
+        return (category.hostel_count, category.room_count, category.bed_count)
+
+    def test_rollups_include_descendants(self):
+        self._refresh()
+        for category in (self.leaf, self.left, self.root):
+            self.assertEqual(self._get_rollups(category), (1, 1, 4))
+        self.assertEqual(self._get_rollups(self.right), (0, 0, 0))
+
+    def test_moved_subtree_is_counted_under_new_parent(self):
+        self._refresh()
+        self.leaf.move_subtree(self.right)
+        self._refresh()
+        self.assertEqual(self._get_rollups(self.left), (0, 0, 0))
+        self.assertEqual(self._get_rollups(self.right), (1, 1, 4))
+        self.assertEqual(self._get_rollups(self.root), (1, 1, 4))
+
+    def test_archived_hostel_is_not_counted(self):
+        self._refresh()
+        self.hostel.active = False
+        self._refresh()
+        self.assertEqual(self._get_rollups(self.root), (0, 0, 0))
+
+    def test_unchanged_categories_are_not_rewritten(self):
+        self._refresh()
+        self.env.cr.execute("SELECT xmin::text FROM hostel_category WHERE id = %s", [self.right.id])
+        xmin = self.env.cr.fetchone()[0]
+        self.leaf.write({'name': "Rollup Leaf Renamed"})
+        self._refresh()
+        self.env.cr.execute("SELECT xmin::text FROM hostel_category WHERE id = %s", [self.right.id])
+        self.assertEqual(self.env.cr.fetchone()[0], xmin)
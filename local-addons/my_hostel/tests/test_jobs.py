@@ -0,0 +1,129 @@
+from unittest.mock import patch
+
+from psycopg2 import errors
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestHostelJobs(TransactionCase):
+
+    """
+Tâches de fond (cf. hostel.job) : reprise après un crash, échec d'un morceau, relance des morceaux en échec,
+et conflit avec une transaction concurrente (le morceau reste en attente).
+
+Le runner valide (commit) chaque morceau, ce qu'un test ne peut pas faire : _run_chunks() prend et exécute les morceaux
+comme _cron_run_jobs(), sans les commits.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        hostel = cls.env['hostel.hostel'].create({'name': "Job Hostel", 'hostel_code': "JH", 'phone': "0000", 'mobile': "0000"})
+        cls.rooms = cls.env['hostel.room'].create([{
+            'name': f"Job Room {room_no}", 'room_no': room_no, 'floor_no': 1, 'student_per_room': 4, 'hostel_id': hostel.id,
+        } for room_no in range(99401, 99416)])
+        cls.Job = cls.env['hostel.job']
+
+    def _enqueue(self):
+        return self.Job._enqueue_recompute(
+            'hostel.room', ['occupied_beds', 'availability'], domain=[('id', 'in', self.rooms.ids)], chunk_size=5,
+        )
+
+    def _run_chunks(self, count=None):
+        Chunk = self.env['hostel.job.chunk']
+        processed = 0
+        while count is None or processed < count:
+            chunk = Chunk._acquire_next()
+            if not chunk:
+                break
+            chunk._run()
+            self.env.invalidate_all()
+            processed += 1
+        return processed
+
+    def test_runner_resumes_at_first_pending_chunk(self):
+        job = self._enqueue()
+        self.assertEqual(job.chunk_count, 3)
+        # "Crash" après le premier morceau : les suivants sont toujours en attente, la reprise ne refait pas le premier.
+        self.assertEqual(self._run_chunks(count=1), 1)
+        self.assertEqual(job.state, 'running')
+        self.assertEqual(job.chunk_ids.mapped('state'), ['done', 'pending', 'pending'])
+        self.assertEqual(self._run_chunks(), 2)
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.progress, 100.0)
+
+    def test_failed_chunk_is_retried(self):
+        job = self._enqueue()
+        failing_ids = set(self.rooms[5:10].ids)
+        JobModel = type(self.Job)
+        run_recompute_chunk = JobModel._run_recompute_chunk
+
+        def flaky_recompute_chunk(model, ids, model_name, field_names):
+            if failing_ids & set(ids):
+                raise ValueError("Simulated failure")
+            return run_recompute_chunk(model, ids, model_name, field_names)
+
+        with patch.object(JobModel, '_run_recompute_chunk', flaky_recompute_chunk):
+            self._run_chunks()
+        self.assertEqual(job.state, 'failed')
+        self.assertEqual((job.done_chunk_count, job.failed_chunk_count), (2, 1))
+        failed_chunk = job.chunk_ids.filtered(lambda chunk: chunk.state == 'failed')
+        self.assertEqual(failed_chunk.sequence, 1)
+        self.assertIn("Simulated failure", failed_chunk.error)
+
+        job.action_retry_failed()
+        self.env.invalidate_all()
+        self.assertEqual(job.state, 'running')
+        self.assertFalse(failed_chunk.error)
+        # Seul le morceau relancé est exécuté à nouveau.
+        self.assertEqual(self._run_chunks(), 1)
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(failed_chunk.result, {'records': 5})
+
+    def test_chunk_runs_as_launching_user(self):
+        user = self.env['res.users'].create({
+            'name': "Job User",
+            'login': 'hostel_job_user',
+            'groups_id': [(6, 0, [self.env.ref('base.group_user').id, self.env.ref('my_hostel.group_hostel_manager').id])],
+        })
+        job = self.Job.with_user(user)._enqueue_recompute('hostel.room', ['availability'], domain=[('id', 'in', self.rooms[:2].ids)])
+        self.assertEqual(job.user_id, user)
+        uids = []
+        JobModel = type(self.Job)
+        run_recompute_chunk = JobModel._run_recompute_chunk
+
+        def recording_recompute_chunk(model, ids, model_name, field_names):
+            uids.append(model.env.uid)
+            return run_recompute_chunk(model, ids, model_name, field_names)
+
+        with patch.object(JobModel, '_run_recompute_chunk', recording_recompute_chunk):
+            self._run_chunks()
+        self.assertEqual(uids, [user.id])
+
+    def test_concurrent_update_leaves_chunk_pending(self):
+        job = self._enqueue()
+        JobModel = type(self.Job)
+
+        def conflicting_recompute_chunk(model, ids, model_name, field_names):
+            raise errors.SerializationFailure("could not serialize access due to concurrent update")
+
+        chunk = self.env['hostel.job.chunk']._acquire_next()
+        with patch.object(JobModel, '_run_recompute_chunk', conflicting_recompute_chunk):
+            with self.assertRaises(errors.SerializationFailure):
+                chunk._run()
+        self.env.invalidate_all()
+        self.assertEqual(chunk.state, 'pending')
+        self.assertFalse(chunk.error)
+        self.assertEqual(self._run_chunks(), 3)
+        self.assertEqual(job.state, 'done')
+
+    def test_unsupported_handler_fails_chunk(self):
+        job = self._enqueue()
+        # Traitement retiré de JOB_HANDLERS après la création de la tâche.
+        job.sudo().write({'method_name': '_unknown_chunk'})
+        self.assertEqual(self._run_chunks(), 3)
+        self.assertEqual(job.chunk_ids.mapped('state'), ['failed'] * 3)
+        self.assertIn("Unsupported job handler", job.chunk_ids[0].error)
+        self.assertEqual(job.state, 'failed')
@@ -0,0 +1,90 @@
+from datetime import date
+
+from odoo.tests import tagged
+
+from .common import HostelPerformanceCase
+
+
+@tagged('post_install', '-at_install', 'hostel_perf')
+class TestHostelPerformance(HostelPerformanceCase):
+
+    """
+Benchmarks des chemins critiques du module. Lancement :
+
+    odoo-bin -d <db> -i my_hostel --test-tags hostel_perf --stop-after-init
+    HOSTEL_BENCH_SCALE=100k odoo-bin -d <db> --test-tags hostel_perf --stop-after-init
+
+Les temps et nombres de requêtes sont écrits dans le log ("hostel bench [...]"). Chaque test compare le nombre de requêtes d'un petit
+et d'un grand lot : si un chemin se met à faire une requête par enregistrement (N+1), le test échoue.
+    """
+
+    def test_room_list_availability(self):
+        rooms = self.data['rooms']
+        self.assertNoNPlusOne(
+            "room list with availability",
+            lambda: rooms[:10].read(['name', 'room_no', 'student_per_room', 'availability']),
+            lambda: rooms.read(['name', 'room_no', 'student_per_room', 'availability']),
+        )
+
+    def test_room_availability_recompute(self):
+        rooms = self.data['rooms']
+        self.assertNoNPlusOne(
+            "room availability recompute",
+            lambda: self.env.add_to_compute(rooms._fields['availability'], rooms[:10]),
+            lambda: self.env.add_to_compute(rooms._fields['availability'], rooms),
+        )
+
+    def test_hostel_display_name(self):
+        hostels = self.data['hostels']
+        self.assertNoNPlusOne(
+            "hostel display_name",
+            lambda: hostels[:2].mapped('display_name'),
+            lambda: hostels.mapped('display_name'),
+        )
+
+    def test_student_duration_compute(self):
+        students = self.data['students']
+        self.assertNoNPlusOne(
+            "student duration compute",
+            lambda: students[:10].mapped('duration'),
+            lambda: students.mapped('duration'),
+        )
+
+    def test_student_duration_inverse(self):
+        # Étudiants qui partagent la même date d'admission : l'inverse doit pouvoir les écrire ensemble.
+        students = self.data['students'].filtered(lambda student: student.admission_date == date(2024, 9, 1))
+        self.assertGreater(len(students), 10)
+        self.assertNoNPlusOne(
+            "student duration inverse",
+            lambda: students[:10].write({'duration': 120}),
+            lambda: students.write({'duration': 150}),
+        )
+
+    def test_category_child_of(self):
+        root = self.data['root_category']
+        leaf = self.data['categories'].filtered(lambda category: not category.child_ids)[:1]
+        Hostel = self.env['hostel.hostel']
+        self.assertNoNPlusOne(
+            "category child_of search",
+            lambda: Hostel.search([('category_id', 'child_of', leaf.id)]),
+            lambda: Hostel.search([('category_id', 'child_of', root.id)]),
+        )
+
+    def test_bulk_student_assignment(self):
+        # Même nombre de chambres cibles, deux fois plus d'étudiants : le nombre de requêtes ne doit dépendre que des chambres.
+        Student = self.env['hostel.student']
+        empty_rooms = self.data['rooms'].filtered(lambda room: not room.student_ids)[:10]
+        self.assertEqual(len(empty_rooms), 10, "The generator should leave some empty rooms")
+        small_students = Student.create([{'student_firstname': f"Small{i}"} for i in range(5)])
+        large_students = Student.create([{'student_firstname': f"Large{i}"} for i in range(10)])
+
+        def allocate(rooms, students, per_room):
+            return lambda: Student._allocate_rooms({
+                room: students[index * per_room:(index + 1) * per_room] for index, room in enumerate(rooms)
+            })
+
+        self.assertNoNPlusOne(
+            "bulk student assignment",
+            allocate(empty_rooms[:5], small_students, 1),
+            allocate(empty_rooms[5:], large_students, 2),
+        )
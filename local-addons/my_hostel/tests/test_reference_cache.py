@@ -0,0 +1,81 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+from odoo.tools.lru import LRU
+
+from odoo.addons.my_hostel.models.hostel_reference_cache import (
+    REFERENCE_CACHE_DIRTY_KEY,
+    REFERENCE_CACHE_SIZE,
+    REFERENCE_CACHE_VERSION_KEY,
+    REFERENCE_CACHE_VERSION_TABLE,
+    _caches,
+)
+
+
+@tagged('post_install', '-at_install')
+class TestReferenceCache(TransactionCase):
+
+    """
+Invalidation du cache des données de référence entre workers (cf. hostel.reference.cache).
+
+Un test ne peut pas valider sa transaction : le début d'une nouvelle transaction est simulé en vidant les données de la transaction
+(version lue, marqueur de modification), et le cache d'un autre worker en remplaçant celui de la base dans _caches.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Cache = cls.env['hostel.reference.cache']
+        cls.hostel = cls.env['hostel.hostel'].create({
+            'name': "Cache Hostel",
+            'hostel_code': "CH",
+            'phone': "0000",
+            'mobile': "0000",
+            'type': 'male',
+        })
+
+    def setUp(self):
+        super().setUp()
+        self._start_transaction()
+        _caches.pop(self.env.cr.dbname, None)
+        self.addCleanup(_caches.pop, self.env.cr.dbname, None)
+
+    def _start_transaction(self):
+        data = self.env.cr.postcommit.data
+        data.pop(REFERENCE_CACHE_VERSION_KEY, None)
+        data.pop(REFERENCE_CACHE_DIRTY_KEY, None)
+
+    def _read_version(self):
+        self.env.cr.execute(f"SELECT version FROM {REFERENCE_CACHE_VERSION_TABLE} WHERE id = 1")
+        return self.env.cr.fetchone()[0]
+
+    def test_write_bumps_version_once_per_transaction(self):
+        version = self._read_version()
+        self.hostel.write({'name': "Renamed Hostel"})
+        self.assertEqual(self._read_version(), version + 1)
+        # Les modifications suivantes de la même transaction ne touchent plus la ligne de version.
+        self.env['hostel.amenities'].create({'name': "Cache WiFi", 'active': True})
+        self.assertEqual(self._read_version(), version + 1)
+
+    def test_new_version_clears_worker_cache(self):
+        self.Cache._get_lru()[('hostel', self.hostel.id)] = ("Stale Hostel", 'male')
+        self.Cache._invalidate()
+        # Transaction suivante : elle voit la nouvelle version et repart d'un cache vide.
+        self._start_transaction()
+        self.assertEqual(len(self.Cache._get_lru()), 0)
+        self.assertEqual(self.Cache._get_hostel_info(self.hostel.ids), {self.hostel.id: ("Cache Hostel (CH)", 'male')})
+
+    def test_modifying_transaction_bypasses_cache(self):
+        self.assertEqual(self.Cache._get_hostel_info(self.hostel.ids), {self.hostel.id: ("Cache Hostel (CH)", 'male')})
+        self.hostel.write({'name': "Renamed Hostel"})
+        # La transaction voit sa propre modification, sans rien écrire dans le cache du worker avant son commit.
+        self.assertEqual(self.Cache._get_hostel_info(self.hostel.ids), {self.hostel.id: ("Renamed Hostel (CH)", 'male')})
+        lru = _caches[self.env.cr.dbname][1]
+        self.assertEqual(lru[('hostel', self.hostel.id)], ("Cache Hostel (CH)", 'male'))
+
+    def test_reader_older_than_cache_gets_none(self):
+        # Un autre worker a déjà mis en cache les données d'une version plus récente que celle visible par cette transaction.
+        newer = _caches[self.env.cr.dbname] = [self._read_version() + 1, LRU(REFERENCE_CACHE_SIZE)]
+        self.assertIsNone(self.Cache._get_lru())
+        # La lecture passe alors par la base, sans remplir le cache de la version plus récente.
+        self.assertEqual(self.Cache._get_hostel_info(self.hostel.ids), {self.hostel.id: ("Cache Hostel (CH)", 'male')})
+        self.assertEqual(len(newer[1]), 0)
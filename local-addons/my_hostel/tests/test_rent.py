@@ -0,0 +1,77 @@
+from datetime import date
+
+from freezegun import freeze_time
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestRentRun(TransactionCase):
+
+    """
+Facturation des loyers (cf. hostel.rent.run._generate_charges()) sur novembre 2024 (30 jours), avec des chambres à 300 par mois :
+- chambre A : Alice tout le mois, Bob à partir du 16 : le loyer des 15 derniers jours est partagé ;
+- Carol passe de la chambre B à la chambre C le 11 : une ligne par chambre, au prorata de ses jours dans chacune.
+Le loyer journalier dépend du mois de chaque jour (octobre : 31 jours), pas de la longueur de la période facturée.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        hostel = cls.env['hostel.hostel'].create({'name': "Rent Hostel", 'hostel_code': "RT", 'phone': "0000", 'mobile': "0000"})
+        cls.room_a, cls.room_b, cls.room_c = cls.env['hostel.room'].create([{
+            'name': f"Rent Room {room_no}", 'room_no': room_no, 'floor_no': 1, 'student_per_room': 4,
+            'rent_amount': 300, 'hostel_id': hostel.id,
+        } for room_no in (99301, 99302, 99303)])
+        Student = cls.env['hostel.student']
+        cls.alice = Student.create({
+            'student_firstname': "Alice", 'admission_date': date(2024, 10, 1), 'room_id': cls.room_a.id,
+        })
+        cls.bob = Student.create({
+            'student_firstname': "Bob", 'admission_date': date(2024, 11, 16), 'room_id': cls.room_a.id,
+        })
+        cls.carol = Student.create({
+            'student_firstname': "Carol", 'admission_date': date(2024, 10, 1), 'room_id': cls.room_b.id,
+        })
+        with freeze_time('2024-11-11'):
+            cls.carol.write({'room_id': cls.room_c.id})
+        cls.run = cls.env['hostel.rent.run'].create({'date_from': date(2024, 11, 1), 'date_to': date(2024, 11, 30)})
+
+    def _get_charges(self, run=None):
+        return {(line.student_id, line.room_id): (line.days, line.amount) for line in (run or self.run).line_ids}
+
+    def test_room_move_is_recorded_in_history(self):
+        move = self.env['hostel.stay.history'].search([('student_ref', '=', self.carol.id), ('reason', '=', 'move')])
+        self.assertEqual(move.room_id, self.room_b)
+        self.assertEqual(move.discharge_date, date(2024, 11, 10))
+        self.assertEqual(self.carol.room_date, date(2024, 11, 11))
+
+    def test_rent_is_split_per_day_between_present_occupants(self):
+        self.run._generate_charges()
+        charges = self._get_charges()
+        self.assertEqual(charges[(self.alice, self.room_a)], (30, 225.0))
+        self.assertEqual(charges[(self.bob, self.room_a)], (15, 75.0))
+
+    def test_room_move_is_billed_in_each_room(self):
+        self.run._generate_charges()
+        charges = self._get_charges()
+        self.assertEqual(charges[(self.carol, self.room_b)], (10, 100.0))
+        self.assertEqual(charges[(self.carol, self.room_c)], (20, 200.0))
+
+    def test_rerun_is_idempotent(self):
+        created = self.run._generate_charges()
+        self.assertGreater(created, 0)
+        line_count, amount_total = self.run.line_count, self.run.amount_total
+        self.assertEqual(self.run._generate_charges(), 0)
+        self.run.invalidate_recordset(['line_count', 'amount_total'])
+        self.assertEqual((self.run.line_count, self.run.amount_total), (line_count, amount_total))
+
+    def test_daily_rate_follows_each_month(self):
+        october = self.env['hostel.rent.run'].create({'date_from': date(2024, 10, 1), 'date_to': date(2024, 10, 31)})
+        october._generate_charges()
+        self.assertEqual(self._get_charges(october)[(self.alice, self.room_a)], (31, 300.0))
+        # Période à cheval sur deux mois : 17 jours d'octobre à 300 / 31, puis 15 jours de novembre à 300 / 30 (seule).
+        overlap = self.env['hostel.rent.run'].create({'date_from': date(2024, 10, 15), 'date_to': date(2024, 11, 15)})
+        overlap._generate_charges()
+        self.assertEqual(self._get_charges(overlap)[(self.alice, self.room_a)], (32, round(300 * 17 / 31 + 150, 2)))
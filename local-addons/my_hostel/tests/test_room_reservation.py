@@ -0,0 +1,64 @@
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestRoomReservation(TransactionCase):
+
+    """
+Réservation des lits (cf. hostel.room.reserve_beds()) : une chambre ne peut jamais être remplie au-delà de sa capacité,
+et une réservation sur plusieurs chambres est tout ou rien.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        hostel = cls.env['hostel.hostel'].create({'name': "Reserve Hostel", 'hostel_code': "RSV", 'phone': "0000", 'mobile': "0000"})
+        cls.room, cls.other_room = cls.env['hostel.room'].create([{
+            'name': f"Reserve Room {room_no}", 'room_no': room_no, 'floor_no': 1, 'student_per_room': 4, 'hostel_id': hostel.id,
+        } for room_no in (99501, 99502)])
+        cls.students = cls.env['hostel.student'].create([
+            {'student_firstname': f"Reserve{i}", 'student_lastname': "Test", 'gender': 'other'} for i in range(6)
+        ])
+
+    def test_reserve_beds_fills_room_to_capacity(self):
+        self.room.reserve_beds(self.students[:4])
+        self.assertEqual(self.students[:4].room_id, self.room)
+        self.assertEqual(self.room.occupied_beds, 4)
+        self.assertEqual(self.room.availability, 0)
+
+    def test_reserve_beds_refuses_overbooking(self):
+        self.room.reserve_beds(self.students[:3])
+        with self.assertRaises(UserError):
+            self.room.reserve_beds(self.students[3:5])
+        self.assertFalse(self.students[3:5].room_id)
+        self.assertEqual(self.room.occupied_beds, 3)
+        # La dernière place libre reste réservable.
+        self.room.reserve_beds(self.students[3])
+        self.assertEqual(self.room.occupied_beds, 4)
+
+    def test_reserve_beds_ignores_students_already_in_room(self):
+        self.room.reserve_beds(self.students[:4])
+        self.room.reserve_beds(self.students[:4])
+        self.assertEqual(self.room.occupied_beds, 4)
+
+    def test_reserve_beds_on_several_rooms_is_all_or_nothing(self):
+        self.room.reserve_beds(self.students[:4])
+        with self.assertRaises(UserError):
+            self.env['hostel.room']._reserve_beds({self.other_room: self.students[4], self.room: self.students[5]})
+        self.assertEqual(self.other_room.occupied_beds, 0)
+        self.assertEqual(self.room.occupied_beds, 4)
+
+    def test_failed_reservation_is_rolled_back_when_caught(self):
+        # Pas d'assertRaises ici : il ouvre lui-même un savepoint, qui masquerait une annulation manquante.
+        self.room.reserve_beds(self.students[:4])
+        try:
+            self.env['hostel.room']._reserve_beds({self.other_room: self.students[4], self.room: self.students[5]})
+        except UserError:
+            pass
+        else:
+            self.fail("The reservation should have been refused")
+        self.env.cr.execute("SELECT occupied_beds FROM hostel_room WHERE id = %s", [self.other_room.id])
+        self.assertEqual(self.env.cr.fetchone()[0], 0)
+        self.assertEqual(self.other_room.availability, 4)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from freezegun import freeze_time
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestStayHistory(TransactionCase):
+
+    """
+Étudiants partis (cf. hostel.stay.history) : ils n'occupent plus de lit, et sont archivés après le délai 'my_hostel.stay_archive_delay'.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        hostel = cls.env['hostel.hostel'].create({'name': "Stay Hostel", 'hostel_code': "STY", 'phone': "0000", 'mobile': "0000"})
+        cls.room = cls.env['hostel.room'].create({
+            'name': "Stay Room", 'room_no': 99601, 'floor_no': 1, 'student_per_room': 1, 'hostel_id': hostel.id,
+        })
+        cls.today = fields.Date.context_today(cls.env['hostel.student'])
+
+    def _create_student(self, name, discharge_days_ago=None):
+        return self.env['hostel.student'].create({
+            'student_firstname': name,
+            'student_lastname': "Stay",
+            'admission_date': self.today - timedelta(days=365),
+            'discharge_date': self.today - timedelta(days=discharge_days_ago) if discharge_days_ago is not None else False,
+            'room_id': self.room.id,
+        })
+
+    def test_discharged_student_frees_bed(self):
+        self._create_student("Gone", discharge_days_ago=10)
+        self.assertEqual(self.room.occupied_beds, 0)
+        # La chambre n'a qu'un lit : le contrôle de capacité ne compte pas l'étudiant parti.
+        self._create_student("Current")
+        self.assertEqual(self.room.occupied_beds, 1)
+
+    def test_release_cron_frees_beds_of_yesterday_discharges(self):
+        self._create_student("Leaving", discharge_days_ago=0)
+        self.assertEqual(self.room.occupied_beds, 1)
+        with freeze_time(self.today + timedelta(days=1)):
+            self.env['hostel.room']._cron_release_discharged_beds()
+        self.room.invalidate_recordset(['occupied_beds', 'availability'])
+        self.assertEqual((self.room.occupied_beds, self.room.availability), (0, 1))
+
+    def test_archive_moves_old_discharges_to_history(self):
+        old = self._create_student("Old", discharge_days_ago=100)
+        recent = self._create_student("Recent", discharge_days_ago=10)
+        old_id = old.id
+        self.env['hostel.stay.history']._archive_discharged_stays()
+        self.assertFalse(old.exists())
+        self.assertTrue(recent.exists())
+        history = self.env['hostel.stay.history'].search([('student_ref', '=', old_id)])
+        self.assertEqual(history.reason, 'discharge')
+        self.assertEqual(history.room_id, self.room)
+        self.assertEqual(history.discharge_date, self.today - timedelta(days=100))
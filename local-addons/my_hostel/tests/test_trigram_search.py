@@ -0,0 +1,42 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestTrigramSearch(TransactionCase):
+
+    """
+Recherche par nom des hostels (cf. hostel.trigram.search.mixin) : saisies courtes ou partielles, fautes de frappe, domaine et limite.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        common = {'phone': "0000", 'mobile': "0000", 'city': "Trigramville"}
+        cls.rosewood, cls.maple, cls.oak = cls.env['hostel.hostel'].create([
+            dict(common, name="Rosewood Lodge", hostel_code="RWL01"),
+            dict(common, name="Maple Lodge", hostel_code="MPL02"),
+            dict(common, name="Oak House", hostel_code="OKH03"),
+        ])
+        cls.hostels = cls.rosewood | cls.maple | cls.oak
+
+    def _search(self, name, domain=None, limit=100):
+        domain = [('id', 'in', self.hostels.ids)] + (domain or [])
+        return self.env['hostel.hostel'].browse(id_ for id_, _name in self.env['hostel.hostel'].name_search(name, domain, limit=limit))
+
+    def test_short_input_matches(self):
+        self.assertEqual(self._search("Ro"), self.rosewood)
+
+    def test_code_prefix_matches(self):
+        self.assertEqual(self._search("MPL"), self.maple)
+
+    def test_closest_match_comes_first(self):
+        self.assertEqual(self._search("Lodge Maple", limit=1), self.maple)
+
+    def test_typo_matches(self):
+        if not self.env.registry.has_trigram:
+            self.skipTest("pg_trgm is not available")
+        self.assertIn(self.rosewood, self._search("Rosewod Lodge"))
+
+    def test_domain_applies_before_limit(self):
+        self.assertEqual(self._search("Lodge", domain=[('id', '!=', self.rosewood.id)], limit=1), self.maple)
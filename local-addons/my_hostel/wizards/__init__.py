@@ -0,0 +1,2 @@
+from . import student_allocation
+from . import room_assignment
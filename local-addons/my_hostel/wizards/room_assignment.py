@@ -0,0 +1,258 @@
+from collections import defaultdict
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+# Types d'hostel compatibles avec chaque genre d'étudiant, par ordre de préférence :
+# on remplit d'abord les hostels dédiés pour garder les places des hostels mixtes aux étudiants qui ne peuvent aller que là.
+COMPATIBLE_HOSTEL_TYPES = {
+    'male': ('male', 'common'),
+    'female': ('female', 'common'),
+}
+DEFAULT_HOSTEL_TYPES = ('common',)
+
+
+class HostelRoomAssignment(models.TransientModel):
+    _name = 'hostel.room.assignment'
+    _description = "Wizard used to compute and apply an automatic room assignment."
+
+    """
+Affectation automatique des étudiants sans chambre.
+
+Le calcul se fait en deux temps :
+1) 'Compute Proposal' calcule une proposition (lignes étudiant -> chambre) que l'on peut relire et corriger,
+2) 'Apply' écrit toutes les affectations en une fois (un write() par chambre, cf. hostel.student._allocate_rooms()).
+
+Le solveur respecte :
+- la capacité des chambres ('availability', stocké),
+- la compatibilité entre le genre de l'étudiant et le type de l'hostel (male/female/common),
+- les préférences optionnelles de l'étudiant : équipements requis (contrainte forte) et étage souhaité (préférence).
+
+Algorithme :
+Plutôt que de chercher une chambre pour chaque étudiant (boucle ORM par étudiant), on regroupe les étudiants en "paquets" qui ont exactement
+les mêmes contraintes (types d'hostel autorisés, équipements, étage). Les paquets les plus contraints sont placés en premier
+(seulement les hostels mixtes, puis le plus d'équipements requis), et chaque paquet remplit les chambres compatibles dans l'ordre :
+hostel dédié avant hostel mixte, bon étage avant les autres, puis chambres déjà les plus remplies (best fit) pour limiter la fragmentation.
+Toutes les données sont chargées en quelques requêtes, le reste se fait en mémoire : le coût est de l'ordre de (nb paquets x nb chambres).
+    """
+
+    # ================
+    # Champs du wizard
+    # ================
+
+    hostel_ids = fields.Many2many(
+        string="Hostels",
+        comodel_name='hostel.hostel',
+        help="Only use rooms of these hostels. Leave empty to use every hostel.",
+    )
+
+    use_preferences = fields.Boolean(
+        string="Use Student Preferences",
+        default=True,
+        help="Take the required amenities and the preferred floor of the students into account",
+    )
+
+    state = fields.Selection(
+        selection=[('draft', 'Draft'), ('proposed', 'Proposed')],
+        default='draft',
+    )
+
+    line_ids = fields.One2many(
+        string="Proposal",
+        comodel_name='hostel.room.assignment.line',
+        inverse_name='assignment_id',
+    )
+
+    unassigned_count = fields.Integer(
+        string="Students without room",
+        readonly=True,
+        help="Students for whom no compatible room with a free bed was found",
+    )
+
+    # ====================
+    # Chargement en masse
+    # ====================
+
+    def _load_students(self):
+        """
+        Retourne la liste des étudiants sans chambre sous forme de dictionnaires (search_read + une requête sur la table de relation).
+        Les étudiants déjà partis (date de départ passée) ne sont pas placés.
+        """
+        Student = self.env['hostel.student']
+        today = fields.Date.context_today(self)
+        students = Student.search_read(
+            [('room_id', '=', False)] + Student._get_current_occupant_domain(today),
+            ['gender', 'preferred_floor_no'],
+            order='admission_date, id',
+        )
+        amenities = defaultdict(frozenset)
+        if self.use_preferences and students:
+            self.env['hostel.student'].flush_model(['preferred_amenity_ids'])
+            self.env.cr.execute(
+                """
+                SELECT student_id, array_agg(amenity_id)
+                  FROM hostel_student_amenities_rel
+                 WHERE student_id IN %s
+              GROUP BY student_id
+                """,
+                (tuple(student['id'] for student in students),),
+            )
+            amenities.update((student_id, frozenset(amenity_ids)) for student_id, amenity_ids in self.env.cr.fetchall())
+        for student in students:
+            student['amenity_ids'] = amenities[student['id']]
+        return students
+
+    def _load_rooms(self):
+        """
+        Retourne les chambres ayant au moins un lit libre dans un hostel actif, avec le type de leur hostel et l'ensemble de leurs équipements.
+        """
+        domain = [('availability', '>', 0), ('hostel_id', '!=', False), ('hostel_id.active', '=', True)]
+        if self.hostel_ids:
+            domain.append(('hostel_id', 'in', self.hostel_ids.ids))
+        rooms = self.env['hostel.room'].search_read(domain, ['hostel_id', 'floor_no', 'availability'], order='id')
+        if not rooms:
+            return rooms
+
+        # Type des hostels : lu dans le cache des données de référence (cf. hostel.reference.cache).
+        hostel_info = self.env['hostel.reference.cache']._get_hostel_info(list({room['hostel_id'][0] for room in rooms}))
+        hostel_types = {hostel_id: hostel_type for hostel_id, (_name, hostel_type) in hostel_info.items()}
+        self.env['hostel.room'].flush_model(['hostel_amenities_ids'])
+        self.env.cr.execute(
+            """
+            SELECT room_id, array_agg(amenity_id)
+              FROM hostel_room_amenities_rel
+             WHERE room_id IN %s
+          GROUP BY room_id
+            """,
+            (tuple(room['id'] for room in rooms),),
+        )
+        amenities = dict((room_id, frozenset(amenity_ids)) for room_id, amenity_ids in self.env.cr.fetchall())
+        for room in rooms:
+            room['type'] = hostel_types.get(room['hostel_id'][0])
+            room['amenity_ids'] = amenities.get(room['id'], frozenset())
+            room['free'] = int(room['availability'])
+        return rooms
+
+    # =======
+    # Solveur
+    # =======
+
+    @api.model
+    def _solve(self, students, rooms):
+        """
+        Calcule l'affectation. 'students' et 'rooms' sont les dictionnaires de _load_students() / _load_rooms().
+        Retourne (liste de (student_id, room_id), nombre d'étudiants non placés).
+        """
+        # Regroupement des étudiants par contraintes identiques.
+        buckets = defaultdict(list)
+        for student in students:
+            hostel_types = COMPATIBLE_HOSTEL_TYPES.get(student['gender'], DEFAULT_HOSTEL_TYPES)
+            floor = student['preferred_floor_no'] if self.use_preferences else 0
+            buckets[(hostel_types, student['amenity_ids'], floor)].append(student['id'])
+
+        # Index des chambres par type d'hostel.
+        rooms_by_type = defaultdict(list)
+        for room in rooms:
+            rooms_by_type[room['type']].append(room)
+
+        def constraint_level(key):
+            hostel_types, amenity_ids, floor = key
+            return (len(hostel_types), -len(amenity_ids), not floor)
+
+        proposal = []
+        unassigned = 0
+        for key in sorted(buckets, key=constraint_level):
+            hostel_types, amenity_ids, floor = key
+            pending = buckets[key]
+
+            candidates = []
+            for rank, hostel_type in enumerate(hostel_types):
+                for room in rooms_by_type[hostel_type]:
+                    if room['free'] > 0 and amenity_ids <= room['amenity_ids']:
+                        candidates.append((rank, bool(floor) and room['floor_no'] != floor, room['free'], room['id'], room))
+            candidates.sort(key=lambda candidate: candidate[:4])
+
+            position = 0
+            for *_sort_key, room in candidates:
+                if position >= len(pending):
+                    break
+                placed = pending[position:position + room['free']]
+                proposal.extend((student_id, room['id']) for student_id in placed)
+                room['free'] -= len(placed)
+                position += len(placed)
+            unassigned += len(pending) - position
+
+        return proposal, unassigned
+
+    # ================
+    # Méthodes actions
+    # ================
+
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_compute_proposal(self):
+        self.ensure_one()
+        proposal, unassigned = self._solve(self._load_students(), self._load_rooms())
+        self.line_ids.unlink()
+        self.env['hostel.room.assignment.line'].create([
+            {'assignment_id': self.id, 'student_id': student_id, 'room_id': room_id}
+            for student_id, room_id in proposal
+        ])
+        self.write({'state': 'proposed', 'unassigned_count': unassigned})
+        return self._reopen()
+
+    def action_apply(self):
+        """
+        Applique la proposition (éventuellement corrigée à la main) : la capacité est revérifiée par chambre puis
+        tout est écrit en une fois par hostel.student._allocate_rooms().
+        Toujours dans la transaction de la requête, quelle que soit la taille de la proposition : l'affectation est tout ou rien.
+        """
+        self.ensure_one()
+        if not self.line_ids:
+            raise UserError("Error. There is no proposal to apply.")
+
+        allocation = defaultdict(lambda: self.env['hostel.student'])
+        for line in self.line_ids:
+            allocation[line.room_id] |= line.student_id
+        for room, students in allocation.items():
+            if len(students) > room.availability:
+                raise UserError(f"Error. The room {room.display_name} does not have enough free beds anymore.")
+        self.env['hostel.student']._allocate_rooms(allocation)
+        return {'type': 'ir.actions.act_window_close'}
+
+
+class HostelRoomAssignmentLine(models.TransientModel):
+    _name = 'hostel.room.assignment.line'
+    _description = "Line of an automatic room assignment proposal."
+
+    assignment_id = fields.Many2one(
+        comodel_name='hostel.room.assignment',
+        required=True,
+        ondelete='cascade',
+    )
+
+    student_id = fields.Many2one(
+        string="Student",
+        comodel_name='hostel.student',
+        required=True,
+        ondelete='cascade',
+    )
+
+    room_id = fields.Many2one(
+        string="Room",
+        comodel_name='hostel.room',
+        required=True,
+        ondelete='cascade',
+    )
+
+    hostel_id = fields.Many2one(
+        string="Hostel",
+        related='room_id.hostel_id',
+    )
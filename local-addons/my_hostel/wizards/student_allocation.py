@@ -0,0 +1,90 @@
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+class HostelStudentAllocation(models.TransientModel):
+    _name = 'hostel.student.allocation'
+    _description = "Wizard used to allocate several students to rooms at once."
+
+    """
+Wizard d'affectation en masse des étudiants.
+
+On sélectionne des étudiants dans la vue liste (Action > Allocate Rooms), puis un hostel ou un ensemble de chambres cible.
+Le wizard :
+- vérifie la capacité de toutes les chambres cibles en une seule passe (champ stocké 'availability'),
+- répartit les étudiants chambre par chambre,
+- écrit 'room_id' avec un write() par chambre (et non un write() par étudiant),
+- ne déclenche le recalcul de 'availability' / 'hostel_id' qu'une seule fois, à la fin.
+    """
+
+    # ================
+    # Champs du wizard
+    # ================
+
+    student_ids = fields.Many2many(
+        string="Students",
+        comodel_name='hostel.student',
+        default=lambda self: self._default_student_ids(),
+    )
+
+    hostel_id = fields.Many2one(
+        string="Hostel",
+        comodel_name='hostel.hostel',
+        help="Allocate students in any room of this hostel",
+    )
+
+    room_ids = fields.Many2many(
+        string="Rooms",
+        comodel_name='hostel.room',
+        domain="[('hostel_id', '=?', hostel_id), ('availability', '>', 0)]",
+        help="Allocate students in these rooms only. Leave empty to use every room of the hostel.",
+    )
+
+    @api.model
+    def _default_student_ids(self):
+        if self.env.context.get('active_model') == 'hostel.student':
+            return [fields.Command.set(self.env.context.get('active_ids', []))]
+        return False
+
+    # ================
+    # Méthodes actions
+    # ================
+
+    def _get_target_rooms(self):
+        """
+        Retourne les chambres cibles, ordonnées par étage puis par numéro pour remplir les chambres dans un ordre prévisible.
+        """
+        self.ensure_one()
+        if self.room_ids:
+            return self.room_ids.sorted(lambda room: (room.floor_no, room.room_no, room.id))
+        if self.hostel_id:
+            return self.env['hostel.room'].search([('hostel_id', '=', self.hostel_id.id)], order='floor_no, room_no, id')
+        raise UserError("Error. Please select an hostel or some rooms.")
+
+    def action_allocate(self):
+        self.ensure_one()
+        rooms = self._get_target_rooms()
+        # Les étudiants déjà dans l'une des chambres cibles n'ont pas besoin d'être déplacés.
+        students = self.student_ids.filtered(lambda student: student.room_id not in rooms)
+        if not students:
+            return {'type': 'ir.actions.act_window_close'}
+
+        # Une seule passe sur la capacité : 'availability' est stocké, lire les chambres ne charge pas leurs occupants.
+        free_beds = sum(max(int(availability), 0) for availability in rooms.mapped('availability'))
+        if free_beds < len(students):
+            raise UserError(
+                f"Error. Not enough free beds: {len(students)} students to allocate "
+                f"but only {free_beds} free beds in the selected rooms."
+            )
+
+        allocation = {}
+        remaining = students
+        for room in rooms:
+            if not remaining:
+                break
+            free = max(int(room.availability), 0)
+            if free:
+                allocation[room] = remaining[:free]
+                remaining = remaining[free:]
+
+        self.env['hostel.student']._allocate_rooms(allocation)
+        return {'type': 'ir.actions.act_window_close'}
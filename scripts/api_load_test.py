@@ -0,0 +1,109 @@
+"""
+Test de charge de l'API JSON de disponibilité (/hostel/api/...).
+
+Plusieurs threads interrogent en boucle un endpoint pendant une durée donnée, en suivant la pagination ('next_after').
+Chaque thread garde l'ETag de chaque page et le renvoie (If-None-Match), comme le ferait le portail qui interroge régulièrement l'API :
+les pages qui n'ont pas changé doivent alors revenir en 304.
+
+Le script affiche le nombre de requêtes par seconde, la répartition des codes HTTP et les latences (p50 / p95 / p99).
+
+Exemple :
+
+    python scripts/api_load_test.py --url http://localhost:8069 --path "/hostel/api/rooms?available=1" --threads 8 --duration 30
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from urllib.parse import urlencode, urlsplit, parse_qsl, urlunsplit
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8069', help="Base URL of the Odoo instance")
+    parser.add_argument('--path', default='/hostel/api/rooms?available=1')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0, help="Duration of the test, in seconds")
+    parser.add_argument('--limit', type=int, default=100, help="Page size")
+    parser.add_argument('--no-etag', action='store_true', help="Do not send If-None-Match (measure uncached requests)")
+    return parser.parse_args()
+
+
+def page_url(base_url, path, after, limit):
+    scheme, netloc, url_path, query, fragment = urlsplit(base_url.rstrip('/') + path)
+    params = dict(parse_qsl(query))
+    params.update(after=after, limit=limit)
+    return urlunsplit((scheme, netloc, url_path, urlencode(params), fragment))
+
+
+def worker(args, deadline, results, lock):
+    # Par URL de page : (ETag, next_after) de la dernière réponse 200
+    pages = {}
+    statuses = Counter()
+    latencies = []
+    after = 0
+    while time.perf_counter() < deadline:
+        url = page_url(args.url, args.path, after, args.limit)
+        http_request = urllib.request.Request(url)
+        if not args.no_etag and url in pages:
+            http_request.add_header('If-None-Match', pages[url][0])
+
+        start = time.perf_counter()
+        next_after = None
+        try:
+            with urllib.request.urlopen(http_request) as response:
+                body = response.read()
+                status = response.status
+                next_after = json.loads(body).get('next_after')
+                pages[url] = (response.headers.get('ETag'), next_after)
+        except urllib.error.HTTPError as error:
+            status = error.code
+            if status == 304:
+                # La page n'a pas changé : on reprend le 'next_after' de la dernière réponse complète.
+                next_after = pages[url][1]
+        latencies.append(time.perf_counter() - start)
+        statuses[status] += 1
+
+        # Dernière page atteinte : on repart du début, comme un nouveau cycle de polling.
+        after = next_after or 0
+
+    with lock:
+        results['statuses'].update(statuses)
+        results['latencies'].extend(latencies)
+
+
+def main():
+    args = parse_args()
+    results = {'statuses': Counter(), 'latencies': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker, args=(args, deadline, results, lock)) for _index in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(results['latencies'])
+    total = len(latencies)
+    if not total:
+        print("No request completed.")
+        return
+
+    def percentile(value):
+        return latencies[min(int(total * value), total - 1)] * 1000
+
+    print(f"{args.path} threads={args.threads} duration={elapsed:.1f}s")
+    print(f"requests={total} throughput={total / elapsed:.1f} req/s")
+    print("status codes: " + ", ".join(f"{status}={count}" for status, count in sorted(results['statuses'].items())))
+    print(f"latency ms: mean={statistics.mean(latencies) * 1000:.1f} p50={percentile(0.5):.1f} "
+          f"p95={percentile(0.95):.1f} p99={percentile(0.99):.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark multi-thread de la réservation de lits (hostel.room.reserve_beds).
+
+Le script crée un hostel de test avec des chambres et des étudiants sans chambre, puis lance plusieurs threads qui
+réservent en parallèle des lits dans des chambres tirées au hasard (volontairement peu nombreuses pour créer de la contention).
+Chaque tentative se fait dans sa propre transaction, rejouée en cas d'erreur de sérialisation comme le fait Odoo pour les requêtes HTTP.
+
+À la fin, il affiche le débit (réservations/s) et vérifie en base qu'aucune chambre n'est sur-réservée.
+Les données de test sont supprimées à la fin.
+
+Exemple :
+
+    python scripts/bench_bed_reservation.py -c odoo.conf -d cookbook --threads 16 --rooms 20 --beds 4 --students 200
+"""
+import argparse
+import random
+import threading
+import time
+
+import odoo
+from odoo.exceptions import UserError
+from psycopg2 import errors
+
+RETRYABLE_ERRORS = (errors.SerializationFailure, errors.DeadlockDetected, errors.LockNotAvailable)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--config', help="Odoo configuration file")
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--addons-path')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--beds', type=int, default=4, help="Beds per room")
+    parser.add_argument('--students', type=int, default=100, help="Students trying to get a bed")
+    return parser.parse_args()
+
+
+def setup(registry, rooms, beds, students):
+    with registry.cursor() as cr:
+        env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+        hostel = env['hostel.hostel'].create({
+            'name': "Reservation Benchmark",
+            'hostel_code': "BENCH-RESA",
+            'phone': "0",
+            'mobile': "0",
+        })
+        max_room_no = max(env['hostel.room'].search([]).mapped('room_no') or [0])
+        room_records = env['hostel.room'].create([
+            {'name': f"Bench {index}", 'room_no': max_room_no + index + 1, 'hostel_id': hostel.id, 'student_per_room': beds}
+            for index in range(rooms)
+        ])
+        student_records = env['hostel.student'].create([
+            {'student_firstname': "Bench", 'student_lastname': str(index)}
+            for index in range(students)
+        ])
+        return hostel.id, room_records.ids, student_records.ids
+
+
+def teardown(registry, hostel_id, room_ids, student_ids):
+    with registry.cursor() as cr:
+        env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+        env['hostel.student'].browse(student_ids).unlink()
+        env['hostel.room'].browse(room_ids).unlink()
+        env['hostel.hostel'].browse(hostel_id).unlink()
+
+
+def worker(registry, room_ids, pending_students, lock, stats):
+    while True:
+        with lock:
+            if not pending_students:
+                return
+            student_id = pending_students.pop()
+        room_id = random.choice(room_ids)
+        while True:
+            try:
+                with registry.cursor() as cr:
+                    env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+                    env['hostel.room'].browse(room_id).reserve_beds(env['hostel.student'].browse(student_id))
+                with lock:
+                    stats['reserved'] += 1
+                break
+            except UserError:
+                with lock:
+                    stats['rejected'] += 1
+                break
+            except RETRYABLE_ERRORS:
+                with lock:
+                    stats['retries'] += 1
+
+
+def count_overbooked(registry, room_ids):
+    with registry.cursor() as cr:
+        cr.execute(
+            """
+            SELECT r.id
+              FROM hostel_room r
+              JOIN hostel_student s ON s.room_id = r.id
+             WHERE r.id IN %s
+          GROUP BY r.id, r.student_per_room
+            HAVING COUNT(s.id) > r.student_per_room
+            """,
+            (tuple(room_ids),),
+        )
+        return len(cr.fetchall())
+
+
+def main():
+    args = parse_args()
+    config_args = ['-d', args.database]
+    if args.config:
+        config_args += ['-c', args.config]
+    if args.addons_path:
+        config_args += ['--addons-path', args.addons_path]
+    odoo.tools.config.parse_config(config_args)
+    registry = odoo.registry(args.database)
+
+    hostel_id, room_ids, student_ids = setup(registry, args.rooms, args.beds, args.students)
+    try:
+        stats = {'reserved': 0, 'rejected': 0, 'retries': 0}
+        pending_students = list(student_ids)
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=worker, args=(registry, room_ids, pending_students, lock, stats))
+            for _index in range(args.threads)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        overbooked = count_overbooked(registry, room_ids)
+        attempts = stats['reserved'] + stats['rejected']
+        print(f"threads={args.threads} rooms={args.rooms} beds/room={args.beds} students={args.students}")
+        print(f"reserved={stats['reserved']} rejected (room full)={stats['rejected']} serialization retries={stats['retries']}")
+        print(f"elapsed={elapsed:.2f}s throughput={attempts / elapsed:.1f} attempts/s")
+        print(f"overbooked rooms={overbooked}")
+        if overbooked:
+            raise SystemExit(1)
+    finally:
+        teardown(registry, hostel_id, room_ids, student_ids)
+
+
+if __name__ == '__main__':
+    main()